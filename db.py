@@ -2,19 +2,26 @@
 InDesign DOM Database Query Layer.
 
 Provides query functions for MCP tools with multi-source support.
+
+Each query function opens (and closes) its own read-only connection to
+``db_path``, or uses an already open ``conn`` with ``sqlite3.Row`` rows,
+which it leaves open.
 """
 
+import re
 import sqlite3
 from pathlib import Path
 
 DEFAULT_DB = Path(__file__).parent / "extendscript.db"
 
 
-def _connect(db_path: str | None = None) -> sqlite3.Connection:
+def connect(db_path: str | None = None) -> sqlite3.Connection:
     """Open a read-only connection."""
     path = db_path or str(DEFAULT_DB)
     conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
     conn.row_factory = sqlite3.Row
+    # The database is small and never written here: read it memory-mapped.
+    conn.execute("PRAGMA mmap_size=268435456")
     return conn
 
 
@@ -40,12 +47,20 @@ def _class_rows(conn: sqlite3.Connection, name: str, source: str | None = None):
     ).fetchall()
 
 
-def lookup_class(name: str, source: str | None = None, db_path: str | None = None) -> dict | list[dict] | None:
+def lookup_class(
+    name: str,
+    source: str | None = None,
+    db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
+) -> dict | list[dict] | None:
     """Full class info for one class name, optionally source-filtered."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
     rows = _class_rows(conn, name=name, source=source)
     if not rows:
-        conn.close()
+        if own_conn:
+            conn.close()
         return None
 
     result = []
@@ -79,29 +94,62 @@ def lookup_class(name: str, source: str | None = None, db_path: str | None = Non
                 "direct_subclasses": subclasses,
             }
         )
-    conn.close()
+    if own_conn:
+        conn.close()
     return result[0] if len(result) == 1 else result
 
 
+def lookup_classes_bulk(
+    names: list[str],
+    db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
+) -> dict[str, list[str]]:
+    """Source keys per class name, for many names in a single query.
+
+    Names that don't exist are absent from the result.
+    """
+    if not names:
+        return {}
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
+    placeholders = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"""SELECT c.name, src.key
+            FROM classes c
+            JOIN sources src ON src.id = c.source_id
+            WHERE c.name IN ({placeholders})
+            ORDER BY c.name, src.key""",
+        tuple(names),
+    ).fetchall()
+    if own_conn:
+        conn.close()
+    found: dict[str, list[str]] = {}
+    for name, source in rows:
+        found.setdefault(name, []).append(source)
+    return found
+
+
 def get_properties(
     class_name: str,
     source: str | None = None,
     filter_text: str | None = None,
     include_inherited: bool = False,
     db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
 ) -> list[dict]:
     """Properties of one class, optionally source-filtered and inherited."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
 
     class_rows = _class_rows(conn, class_name, source)
     class_ids = [row["id"] for row in class_rows]
     if include_inherited:
-        inherited_ids = []
-        for row in class_rows:
-            inherited_ids.extend(_get_ancestor_chain_ids(conn, row["id"]))
-        class_ids = list(dict.fromkeys(inherited_ids))
+        class_ids = _get_ancestor_chain_ids(conn, class_ids)
     if not class_ids:
-        conn.close()
+        if own_conn:
+            conn.close()
         return []
 
     placeholders = ",".join("?" for _ in class_ids)
@@ -124,7 +172,8 @@ def get_properties(
     query += " ORDER BY src.key, c.name, p.element_type, p.name"
 
     rows = conn.execute(query, params).fetchall()
-    conn.close()
+    if own_conn:
+        conn.close()
 
     return [
         {
@@ -151,19 +200,20 @@ def get_methods(
     filter_text: str | None = None,
     include_inherited: bool = False,
     db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
 ) -> list[dict]:
     """Methods of one class with short signatures."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
 
     class_rows = _class_rows(conn, class_name, source)
     class_ids = [row["id"] for row in class_rows]
     if include_inherited:
-        inherited_ids = []
-        for row in class_rows:
-            inherited_ids.extend(_get_ancestor_chain_ids(conn, row["id"]))
-        class_ids = list(dict.fromkeys(inherited_ids))
+        class_ids = _get_ancestor_chain_ids(conn, class_ids)
     if not class_ids:
-        conn.close()
+        if own_conn:
+            conn.close()
         return []
 
     placeholders = ",".join("?" for _ in class_ids)
@@ -218,7 +268,8 @@ def get_methods(
             }
         )
 
-    conn.close()
+    if own_conn:
+        conn.close()
     return result
 
 
@@ -227,9 +278,12 @@ def get_method_detail(
     method_name: str,
     source: str | None = None,
     db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
 ) -> dict | list[dict] | None:
     """Full detail for a single method including all parameters."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
 
     clause, params = _source_clause(source)
     rows = conn.execute(
@@ -244,7 +298,8 @@ def get_method_detail(
     ).fetchall()
 
     if not rows:
-        conn.close()
+        if own_conn:
+            conn.close()
         return None
 
     result = []
@@ -280,13 +335,21 @@ def get_method_detail(
                 ],
             }
         )
-    conn.close()
+    if own_conn:
+        conn.close()
     return result[0] if len(result) == 1 else result
 
 
-def get_enum_values(enum_name: str, source: str | None = None, db_path: str | None = None) -> dict | list[dict] | None:
+def get_enum_values(
+    enum_name: str,
+    source: str | None = None,
+    db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
+) -> dict | list[dict] | None:
     """Enum values for an enumeration class."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
     clause, params = _source_clause(source)
     rows = conn.execute(
         f"""SELECT c.id, c.name, c.description, src.key AS source
@@ -297,7 +360,8 @@ def get_enum_values(enum_name: str, source: str | None = None, db_path: str | No
         (enum_name, *params),
     ).fetchall()
     if not rows:
-        conn.close()
+        if own_conn:
+            conn.close()
         return None
 
     result = []
@@ -324,16 +388,25 @@ def get_enum_values(enum_name: str, source: str | None = None, db_path: str | No
                 ],
             }
         )
-    conn.close()
+    if own_conn:
+        conn.close()
     return result[0] if len(result) == 1 else result
 
 
-def get_hierarchy(class_name: str, source: str | None = None, db_path: str | None = None) -> dict | list[dict] | None:
+def get_hierarchy(
+    class_name: str,
+    source: str | None = None,
+    db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
+) -> dict | list[dict] | None:
     """Full inheritance chain + direct subclasses."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
     rows = _class_rows(conn, class_name, source)
     if not rows:
-        conn.close()
+        if own_conn:
+            conn.close()
         return None
 
     result = []
@@ -357,43 +430,150 @@ def get_hierarchy(class_name: str, source: str | None = None, db_path: str | Non
                 "direct_subclasses": subclasses,
             }
         )
-    conn.close()
+    if own_conn:
+        conn.close()
     return result[0] if len(result) == 1 else result
 
 
+# Ranked FTS hits, read back from their entity tables in the same query:
+# dom_search is contentless and only search_refs knows where a row came from.
+_SEARCH_HITS_SQL = """
+    WITH hits AS (
+        SELECT r.id, r.entity_type, r.entity_id, src.key AS source, dom_search.rank AS rank
+        FROM dom_search
+        JOIN search_refs r ON r.id = dom_search.rowid
+        JOIN sources src ON r.source_id = src.id
+        WHERE dom_search MATCH ?{clause}
+        ORDER BY dom_search.rank, r.id
+        LIMIT ?
+    )
+    SELECT hits.entity_type, c.name AS entity_name, '' AS parent_name, c.description,
+           hits.source, hits.rank, hits.id
+    FROM hits JOIN classes c ON c.id = hits.entity_id
+    WHERE hits.entity_type IN ('class', 'enum')
+    UNION ALL
+    SELECT hits.entity_type, p.name, c.name, p.description, hits.source, hits.rank, hits.id
+    FROM hits
+    JOIN properties p ON p.id = hits.entity_id
+    JOIN classes c ON c.id = p.class_id
+    WHERE hits.entity_type = 'property'
+    UNION ALL
+    SELECT hits.entity_type, m.name, c.name, m.description, hits.source, hits.rank, hits.id
+    FROM hits
+    JOIN methods m ON m.id = hits.entity_id
+    JOIN classes c ON c.id = m.class_id
+    WHERE hits.entity_type = 'method'
+    UNION ALL
+    SELECT hits.entity_type, pa.name, c.name, pa.description, hits.source, hits.rank, hits.id
+    FROM hits
+    JOIN parameters pa ON pa.id = hits.entity_id
+    JOIN methods m ON m.id = pa.method_id
+    JOIN classes c ON c.id = m.class_id
+    WHERE hits.entity_type = 'parameter'
+    ORDER BY 6, 7
+"""
+
+
+# Name matches on the entity tables, for searches FTS cannot answer.
+_SEARCH_LIKE_SQL = """
+    SELECT * FROM (
+        SELECT CASE WHEN c.is_enum THEN 'enum' ELSE 'class' END AS entity_type,
+               c.name AS entity_name, '' AS parent_name, c.description, src.key AS source
+        FROM classes c JOIN sources src ON c.source_id = src.id
+        WHERE c.name LIKE ? ESCAPE '\\'{clause}
+        UNION ALL
+        SELECT 'property', p.name, c.name, p.description, src.key
+        FROM properties p JOIN classes c ON p.class_id = c.id JOIN sources src ON c.source_id = src.id
+        WHERE p.name LIKE ? ESCAPE '\\'{clause}
+        UNION ALL
+        SELECT 'method', m.name, c.name, m.description, src.key
+        FROM methods m JOIN classes c ON m.class_id = c.id JOIN sources src ON c.source_id = src.id
+        WHERE m.name LIKE ? ESCAPE '\\'{clause}
+    )
+    ORDER BY length(entity_name), entity_name, parent_name
+    LIMIT ?
+"""
+
+_FTS_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
+_FTS_TERM = re.compile(r'[^\s"]+')
+_HAS_ALNUM = re.compile(r"[^\W_]")
+_BAREWORD = re.compile(r"\w+")
+_LIKE_SPECIAL = re.compile(r"[\\%_]")
+
+
+def _fts_query(query: str) -> str:
+    """Turn free text into an FTS5 prefix query.
+
+    Terms that are not plain words (``app.activeDocument``, ``$.writeln``)
+    are quoted so FTS5 reads them as phrases instead of query syntax.
+    """
+    terms = []
+    for term in _FTS_TERM.findall(query):
+        if not _HAS_ALNUM.search(term):
+            continue
+        if term in _FTS_OPERATORS or not _BAREWORD.fullmatch(term):
+            term = f'"{term}"'
+        terms.append(f"{term}*")
+    return " ".join(terms)
+
+
+def _search_like(conn: sqlite3.Connection, query: str, source: str | None, max_results: int) -> list[dict]:
+    """Fallback search: names containing the last dotted part of ``query``.
+
+    ``app.activeDocument`` looks for names containing ``activeDocument``;
+    a fragment such as ``ctiveDoc`` finds ``activeDocument`` itself.
+    """
+    name = query.strip().rsplit(".", 1)[-1].strip()
+    if not name:
+        return []
+    pattern = "%" + _LIKE_SPECIAL.sub(r"\\\g<0>", name) + "%"
+    clause, params = _source_clause(source)
+    rows = conn.execute(
+        _SEARCH_LIKE_SQL.format(clause=clause),
+        (pattern, *params) * 3 + (max_results,),
+    ).fetchall()
+    return [
+        {
+            "entity_type": r["entity_type"],
+            "entity_name": r["entity_name"],
+            "parent_name": r["parent_name"],
+            "description": r["description"] or "",
+            "source": r["source"],
+        }
+        for r in rows
+    ]
+
+
 def search_dom(
     query: str,
     source: str | None = None,
     max_results: int = 20,
     db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
 ) -> list[dict]:
-    """Full-text search across all entities."""
-    conn = _connect(db_path)
-    fts_query = " ".join(f"{term}*" for term in query.split())
-
-    if source:
-        rows = conn.execute(
-            """SELECT entity_type, entity_name, parent_name, description, source, rank
-               FROM dom_search
-               WHERE dom_search MATCH ?
-                 AND source = ?
-               ORDER BY rank
-               LIMIT ?""",
-            (fts_query, source, max_results),
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            """SELECT entity_type, entity_name, parent_name, description, source, rank
-               FROM dom_search
-               WHERE dom_search MATCH ?
-               ORDER BY rank
-               LIMIT ?""",
-            (fts_query, max_results),
-        ).fetchall()
-
-    conn.close()
+    """Full-text search across all entities, with a name match fallback."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
+    fts_query = _fts_query(query)
+    clause, params = _source_clause(source)
 
-    return [
+    rows = []
+    if fts_query:
+        try:
+            rows = conn.execute(
+                _SEARCH_HITS_SQL.format(clause=clause),
+                (fts_query, *params, max_results),
+            ).fetchall()
+        except sqlite3.OperationalError as exc:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_refs'").fetchone():
+                raise sqlite3.OperationalError(
+                    "The database predates the search_refs table (parser 2.1.0); "
+                    "rebuild it with `python manage.py build-all ...`"
+                ) from exc
+            raise
+
+    results = [
         {
             "entity_type": r["entity_type"],
             "entity_name": r["entity_name"],
@@ -403,6 +583,12 @@ def search_dom(
         }
         for r in rows
     ]
+    if not results:
+        results = _search_like(conn, query, source, max_results)
+
+    if own_conn:
+        conn.close()
+    return results
 
 
 def list_classes(
@@ -410,9 +596,12 @@ def list_classes(
     type_filter: str = "all",
     source: str | None = None,
     db_path: str | None = None,
+    conn: sqlite3.Connection | None = None,
 ) -> list[dict]:
     """Class overview, filterable by suite/type/source."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
 
     query = """
         SELECT c.name, c.is_enum, c.description, s.name AS suite_name, src.key AS source
@@ -437,7 +626,8 @@ def list_classes(
 
     query += " ORDER BY src.key, c.name"
     rows = conn.execute(query, params).fetchall()
-    conn.close()
+    if own_conn:
+        conn.close()
 
     return [
         {
@@ -451,10 +641,15 @@ def list_classes(
     ]
 
 
-def dom_info(db_path: str | None = None) -> dict:
-    """DB metadata and statistics."""
-    conn = _connect(db_path)
-    meta = {row["key"]: row["value"] for row in conn.execute("SELECT key, value FROM db_meta").fetchall()}
+def dom_info(db_path: str | None = None, conn: sqlite3.Connection | None = None) -> dict:
+    """DB metadata and statistics.
+
+    An open ``conn`` (any row factory) is used as-is and left open.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
+    meta = {key: value for key, value in conn.execute("SELECT key, value FROM db_meta").fetchall()}
 
     (suite_count,) = conn.execute("SELECT COUNT(*) FROM suites").fetchone()
     (class_count,) = conn.execute("SELECT COUNT(*) FROM classes").fetchone()
@@ -469,7 +664,8 @@ def dom_info(db_path: str | None = None) -> dict:
            GROUP BY src.key
            ORDER BY src.key"""
     ).fetchall()
-    conn.close()
+    if own_conn:
+        conn.close()
 
     return {
         "dom_version": meta.get("dom_version", ""),
@@ -479,7 +675,7 @@ def dom_info(db_path: str | None = None) -> dict:
         "source_keys": meta.get("source_keys", ""),
         "build_timestamp": meta.get("build_timestamp", ""),
         "parser_version": meta.get("parser_version", ""),
-        "sources": [{"source": r["source"], "class_count": r["class_count"]} for r in source_rows],
+        "sources": [{"source": source, "class_count": class_count} for source, class_count in source_rows],
         "counts": {
             "suites": suite_count,
             "classes": class_count,
@@ -492,9 +688,11 @@ def dom_info(db_path: str | None = None) -> dict:
     }
 
 
-def list_sources(db_path: str | None = None) -> list[dict]:
+def list_sources(db_path: str | None = None, conn: sqlite3.Connection | None = None) -> list[dict]:
     """List available sources with entity counts."""
-    conn = _connect(db_path)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(db_path)
     rows = conn.execute(
         """SELECT src.key AS source, src.label, src.file,
                   COUNT(DISTINCT c.id) AS classes,
@@ -507,7 +705,8 @@ def list_sources(db_path: str | None = None) -> list[dict]:
            GROUP BY src.id
            ORDER BY src.key"""
     ).fetchall()
-    conn.close()
+    if own_conn:
+        conn.close()
     return [
         {
             "source": r["source"],
@@ -523,10 +722,10 @@ def list_sources(db_path: str | None = None) -> list[dict]:
     ]
 
 
-def knowledge_overview(db_path: str | None = None) -> dict:
+def knowledge_overview(db_path: str | None = None, conn: sqlite3.Connection | None = None) -> dict:
     """Return capability overview for multi-source scripting lookups."""
     return {
-        "sources": list_sources(db_path=db_path),
+        "sources": list_sources(db_path=db_path, conn=conn),
         "extendscript_specials": ["$", "UnitValue", "File", "Folder", "Socket", "XML", "XMLList", "RegExp"],
         "scriptui_note": (
             "ScriptUI is legacy technology. Prefer UXP for new UI development. "
@@ -537,47 +736,39 @@ def knowledge_overview(db_path: str | None = None) -> dict:
     }
 
 
-def _get_ancestor_chain_ids(conn: sqlite3.Connection, class_id: int) -> list[int]:
-    """Walk superclass chain upward by IDs within the same source."""
-    chain = []
-    current_id = class_id
-    seen = set()
-
-    while current_id and current_id not in seen:
-        chain.append(current_id)
-        seen.add(current_id)
-        row = conn.execute(
-            """SELECT parent.id AS parent_id
-               FROM classes child
-               LEFT JOIN classes parent
-                 ON parent.name = child.superclass_name
-                AND parent.source_id = child.source_id
-               WHERE child.id = ?""",
-            (current_id,),
-        ).fetchone()
-        current_id = row["parent_id"] if row and row["parent_id"] else None
-    return chain
+# Superclass chains of the seed classes in one query. Parents are resolved
+# within the child's source; the depth cap ends cyclic chains.
+_ANCESTORS_SQL = """
+    WITH RECURSIVE chain(seed, depth, id) AS (
+        VALUES {seeds}
+        UNION ALL
+        SELECT chain.seed, chain.depth + 1, parent.id
+        FROM chain
+        JOIN classes child ON child.id = chain.id
+        JOIN classes parent
+          ON parent.name = child.superclass_name
+         AND parent.source_id = child.source_id
+        WHERE chain.depth < 64
+    )
+    SELECT chain.id, c.name
+    FROM chain JOIN classes c ON c.id = chain.id
+    ORDER BY chain.seed, chain.depth
+"""
+
+
+def _ancestor_rows(conn: sqlite3.Connection, class_ids: list[int]) -> list:
+    """(id, name) of each class and its superclasses, nearest first."""
+    if not class_ids:
+        return []
+    seeds = ", ".join(f"({seed}, 0, ?)" for seed in range(len(class_ids)))
+    return conn.execute(_ANCESTORS_SQL.format(seeds=seeds), class_ids).fetchall()
+
+
+def _get_ancestor_chain_ids(conn: sqlite3.Connection, class_ids: list[int]) -> list[int]:
+    """Superclass chains of several classes by ID, without duplicates."""
+    return list(dict.fromkeys(row["id"] for row in _ancestor_rows(conn, class_ids)))
 
 
 def _get_ancestor_chain_names(conn: sqlite3.Connection, class_id: int) -> list[str]:
-    """Walk superclass chain upward by class names."""
-    names = []
-    current_id = class_id
-    seen = set()
-
-    while current_id and current_id not in seen:
-        seen.add(current_id)
-        row = conn.execute(
-            """SELECT child.name AS name, parent.id AS parent_id
-               FROM classes child
-               LEFT JOIN classes parent
-                 ON parent.name = child.superclass_name
-                AND parent.source_id = child.source_id
-               WHERE child.id = ?""",
-            (current_id,),
-        ).fetchone()
-        if not row:
-            break
-        names.append(row["name"])
-        current_id = row["parent_id"]
-    return names
+    """Superclass chain of one class by class names."""
+    return list({row["id"]: row["name"] for row in _ancestor_rows(conn, [class_id])}.values())
@@ -8,24 +8,29 @@
 """
 InDesign Exec MCP Server.
 
-Provides 8 tools for executing JSX code in Adobe InDesign via COM/OLE:
+Provides 10 tools for executing JSX code in Adobe InDesign via COM/OLE:
   1. run_jsx             - Execute JSX code with undo grouping
   2. get_document_info   - Query active document overview + active view context
   3. get_selection       - Query current selection
   4. eval_expression     - Evaluate a short expression
+     eval_expressions    - Evaluate several expressions in one round-trip
   5. undo                - Undo last agent operation(s)
   6. report_learning     - Submit local pitfall/best-practice learnings
   7. get_gotchas         - Retrieve curated gotchas (optionally context-filtered)
   8. get_quick_reference - DOM cheatsheet for common access patterns
+  9. run_jsx_batch       - Execute several JSX snippets in one round-trip
 
 Requires InDesign Desktop running on Windows.
 Uses UndoModes.ENTIRE_SCRIPT to group all operations per call.
 No eval() anywhere -- JSX code is inlined, results serialised via __safeStringify.
 """
 
+import functools
 import json
 import re
 import sys
+import threading
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -36,6 +41,11 @@ from mcp.server.fastmcp import FastMCP
 
 import indesign_com as com
 
+try:  # optional, faster JSON encoding of large responses
+    import orjson
+except ImportError:
+    orjson = None
+
 BASE_DIR = Path(__file__).parent
 GOTCHAS_PATH = BASE_DIR / "gotchas.json"
 SUBMISSIONS_DIR = BASE_DIR / "submissions"
@@ -45,6 +55,15 @@ ALLOWED_LEARNING_CATEGORIES = {"dom", "scriptui", "extendscript", "execution", "
 ALLOWED_LEARNING_SEVERITIES = {"blocker", "warning", "tip"}
 SEVERITY_RANK = {"tip": 1, "warning": 2, "blocker": 3}
 
+_TOKEN_RE = re.compile(r"[a-z0-9_#]+")
+
+# (gotchas.json mtime_ns, value) -- see _load_gotchas()
+_gotcha_cache: tuple[int, list["_Gotcha"]] | None = None
+_quick_reference_cache: tuple[int | None, str] | None = None
+
+# Serializes appends to the submission queue across worker threads.
+_submission_lock = threading.Lock()
+
 mcp = FastMCP(
     "InDesign Exec",
     instructions=(
@@ -156,7 +175,7 @@ Do NOT use `return` — the wrapper handles that.
 1. **Inspect**: `get_document_info` or `eval_expression` to understand the document
 2. **Look up**: Use indesign-dom MCP to find the right classes/methods
 3. **Execute**: `run_jsx` with undo_mode="entire" and a descriptive undo_name
-4. **Verify**: `eval_expression` or `get_selection` to check the result
+4. **Verify**: `eval_expression` (`eval_expressions` for several values) or `get_selection` to check the result
 5. **Rollback**: `undo` if the result is wrong, then try a different approach
 
 ## Operational Policy (MUST/SHOULD)
@@ -331,9 +350,42 @@ each element needs a different value.**
 """
 
 
+_COMPACT_JSON_SIZE = 4096
+
+
 def _fmt(obj) -> str:
-    """Format result as indented JSON string."""
-    return json.dumps(obj, indent=2, ensure_ascii=False)
+    """Format result as JSON string (orjson when available).
+
+    Results up to _COMPACT_JSON_SIZE UTF-8 bytes are indented; larger ones
+    are written compact, which roughly halves them.
+    """
+    if orjson is not None:
+        try:
+            text = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+            if len(text) <= _COMPACT_JSON_SIZE:
+                text = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            return text.decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bit: let json decide
+    text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    if len(text.encode("utf-8")) <= _COMPACT_JSON_SIZE:
+        text = json.dumps(obj, indent=2, ensure_ascii=False)
+    return text
+
+
+def _choice_error(field: str, allowed: set[str]) -> str:
+    """Pre-render the tool error returned for an invalid choice value."""
+    return _fmt({"success": False, "error": f"{field} must be one of: {sorted(allowed)}"})
+
+
+_CATEGORY_ERROR = _choice_error("category", ALLOWED_LEARNING_CATEGORIES)
+_SEVERITY_ERROR = _choice_error("severity", ALLOWED_LEARNING_SEVERITIES)
+_MIN_SEVERITY_ERROR = _choice_error("min_severity", ALLOWED_LEARNING_SEVERITIES)
+
+
+def _validate_choice(value: str, allowed: set[str], error: str) -> str | None:
+    """Return the pre-rendered error if value is not allowed, else None."""
+    return None if value in allowed else error
 
 
 def _check_connection() -> str | None:
@@ -376,45 +428,117 @@ def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
-def _load_gotcha_entries() -> list[dict]:
-    """Load curated gotcha entries from gotchas.json."""
-    if not GOTCHAS_PATH.exists():
+def _queue_submission(line: str):
+    """Append one submission line to the queue file.
+
+    Written through on every call: the stdio server is usually stopped by
+    killing it, so anything held in memory would be lost.
+    """
+    with _submission_lock:
+        SUBMISSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        with SUBMISSIONS_PATH.open("a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _gotchas_mtime() -> int | None:
+    """Return the gotchas.json modification time in ns, or None if missing."""
+    try:
+        return GOTCHAS_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@dataclass(slots=True)
+class _Gotcha:
+    """One curated gotcha with its fields coerced once at load time.
+
+    ``raw`` is the entry exactly as stored in gotchas.json and is what the
+    tools return; the other fields only serve filtering and matching.
+    """
+
+    raw: dict
+    id: str
+    problem: str
+    solution: str
+    severity: str
+    severity_rank: int
+    triggers: tuple[str, ...]
+    trigger_set: frozenset[str]
+    norm_problem: str
+    norm_solution: str
+
+    @classmethod
+    def from_entry(cls, entry: dict) -> "_Gotcha":
+        # Intern the small closed vocabularies so later comparisons are cheap.
+        for key in ("severity", "category"):
+            if isinstance(entry.get(key), str):
+                entry[key] = sys.intern(entry[key])
+        severity = sys.intern(str(entry.get("severity", "tip")).lower())
+        raw_triggers = entry.get("triggers", [])
+        if not isinstance(raw_triggers, list):
+            raw_triggers = []
+        triggers = tuple(n for n in (str(t).strip().lower() for t in raw_triggers) if n)
+        return cls(
+            raw=entry,
+            id=str(entry.get("id", "")).strip(),
+            problem=str(entry.get("problem", "")).strip(),
+            solution=str(entry.get("solution", "")).strip(),
+            severity=severity,
+            severity_rank=SEVERITY_RANK.get(severity, 0),
+            triggers=triggers,
+            trigger_set=frozenset(triggers),
+            norm_problem=_normalize_text(str(entry.get("problem", ""))),
+            norm_solution=_normalize_text(str(entry.get("solution", ""))),
+        )
+
+
+def _load_gotchas() -> list[_Gotcha]:
+    """Load curated gotcha entries from gotchas.json.
+
+    The parsed entries are cached and keyed by the file's mtime, so repeated
+    tool calls only re-read the file after it has been edited (for example
+    by ``manage.py review-submissions``).  Callers must not mutate the list.
+    """
+    global _gotcha_cache
+    mtime = _gotchas_mtime()
+    if mtime is None:
         return []
+    if _gotcha_cache is not None and _gotcha_cache[0] == mtime:
+        return _gotcha_cache[1]
     try:
-        data = json.loads(GOTCHAS_PATH.read_text(encoding="utf-8"))
+        data = json.loads(GOTCHAS_PATH.read_bytes())
     except Exception:
         return []
-    entries = data.get("entries", [])
-    return entries if isinstance(entries, list) else []
+    entries = data.get("entries", []) if isinstance(data, dict) else []
+    if not isinstance(entries, list):
+        entries = []
+    gotchas = [_Gotcha.from_entry(entry) for entry in entries if isinstance(entry, dict)]
+    _gotcha_cache = (mtime, gotchas)
+    return gotchas
 
 
-def _context_tokens(context: str) -> list[str]:
+@functools.lru_cache(maxsize=512)
+def _context_tokens(context: str) -> tuple[str, ...]:
     """Tokenize context for lightweight keyword matching."""
-    lowered = context.lower()
-    return [tok for tok in re.split(r"[^a-z0-9_#]+", lowered) if tok]
+    return tuple(_TOKEN_RE.findall(context.lower()))
 
 
-def _score_gotcha_for_context(entry: dict, context: str, tokens: list[str]) -> int:
+def _score_gotcha_for_context(gotcha: _Gotcha, context: str, tokens: tuple[str, ...]) -> int:
     """Return match score for one gotcha against context."""
     score = 0
-    triggers = entry.get("triggers", [])
-    if not isinstance(triggers, list):
-        return score
-    for trigger in triggers:
-        needle = str(trigger).strip().lower()
-        if not needle:
-            continue
+    for needle in gotcha.triggers:
         if needle in context:
             score += 2
-            continue
-        if any(needle in token or token in needle for token in tokens):
+        # Every token is a substring of context, so "needle in token" can
+        # no longer match here; only the reverse direction is left to test.
+        elif any(token in needle for token in tokens):
             score += 1
     return score
 
 
 def _normalize_text(text: str) -> str:
     """Normalize text for duplicate detection."""
-    return re.sub(r"\s+", " ", text.strip().lower())
+    return " ".join(text.lower().split())
 
 
 # ---------------------------------------------------------------------------
@@ -422,7 +546,7 @@ def _normalize_text(text: str) -> str:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
-def run_jsx(
+async def run_jsx(
     code: str,
     undo_name: str = "Agent Script",
     undo_mode: str = "entire",
@@ -455,12 +579,12 @@ def run_jsx(
                    "auto" lets InDesign handle undo per-operation,
                    "none" skips undo tracking (for read-only operations)
     """
-    err = _check_connection()
+    err = await com.call_async(_check_connection)
     if err:
         return _fmt({"success": False, "error": err})
 
     try:
-        result = com.run_jsx(code, undo_name=undo_name, undo_mode=undo_mode)
+        result = await com.call_async(com.run_jsx, code, undo_name=undo_name, undo_mode=undo_mode)
         return _fmt(result)
     except Exception as e:
         return _fmt({"success": False, "error": str(e), "name": type(e).__name__})
@@ -534,10 +658,11 @@ try {
     }
 } catch(viewErr) {}
 """
+com.register_operation("get_document_info", _DOC_INFO_JSX)
 
 
 @mcp.tool()
-def get_document_info() -> str:
+async def get_document_info() -> str:
     """Get an overview of the active InDesign document.
 
     Returns document name, page count, item counts, selection info,
@@ -545,12 +670,12 @@ def get_document_info() -> str:
     context (current spread, page, zoom, and item counts on the active
     spread) when a layout window is open. Read-only operation.
     """
-    err = _check_document()
+    err = await com.call_async(_check_document)
     if err:
         return _fmt({"success": False, "error": err})
 
     try:
-        result = com.run_jsx(_DOC_INFO_JSX, undo_mode="none")
+        result = await com.call_async(com.run_registered, "get_document_info", undo_mode="none")
         return _fmt(_unwrap_result(result))
     except Exception as e:
         return _fmt({"success": False, "error": str(e)})
@@ -643,23 +768,25 @@ for (var i = 0; i < sel.length && i < 50; i++) {
 }
 __result = {count: sel.length, items: items};
 """
+com.register_operation("get_selection_basic", _SELECTION_BASIC_JSX)
+com.register_operation("get_selection_full", _SELECTION_FULL_JSX)
 
 
 @mcp.tool()
-def get_selection(detail_level: str = "basic") -> str:
+async def get_selection(detail_level: str = "basic") -> str:
     """Get information about the current selection in InDesign.
 
     Args:
         detail_level: "basic" for type/bounds/content, "full" adds styles/colors/page
     """
-    err = _check_document()
+    err = await com.call_async(_check_document)
     if err:
         return _fmt({"success": False, "error": err})
 
-    jsx = _SELECTION_FULL_JSX if detail_level == "full" else _SELECTION_BASIC_JSX
+    op = "get_selection_full" if detail_level == "full" else "get_selection_basic"
 
     try:
-        result = com.run_jsx(jsx, undo_mode="none")
+        result = await com.call_async(com.run_registered, op, undo_mode="none")
         return _fmt(_unwrap_result(result))
     except Exception as e:
         return _fmt({"success": False, "error": str(e)})
@@ -670,7 +797,7 @@ def get_selection(detail_level: str = "basic") -> str:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
-def eval_expression(expression: str) -> str:
+async def eval_expression(expression: str) -> str:
     """Evaluate a short ExtendScript expression in InDesign and return the result.
 
     Use this for quick read-only queries like checking a property value
@@ -679,12 +806,12 @@ def eval_expression(expression: str) -> str:
     Args:
         expression: The expression to evaluate (e.g. "app.activeDocument.pages.length")
     """
-    err = _check_connection()
+    err = await com.call_async(_check_connection)
     if err:
         return _fmt({"success": False, "error": err})
 
     try:
-        result = com.eval_expr(expression)
+        result = await com.call_async(com.eval_expr, expression)
         if isinstance(result, str) and result.startswith("ERROR: "):
             return _fmt({"success": False, "error": result[7:]})
         return _fmt({"success": True, "result": result})
@@ -692,6 +819,41 @@ def eval_expression(expression: str) -> str:
         return _fmt({"success": False, "error": str(e)})
 
 
+@mcp.tool()
+async def eval_expressions(expressions: list[str]) -> str:
+    """Evaluate several ExtendScript expressions in InDesign with one round-trip.
+
+    Same conventions as eval_expression, but all expressions run in a single
+    DoScript call. A failing expression is reported in its slot without
+    affecting the others. No undo wrapping is applied.
+
+    Returns {"success": true, "results": [...]} with one
+    {"success", "result"/"error"} entry per expression, in order.
+
+    Args:
+        expressions: Expressions to evaluate (e.g. ["app.activeDocument.pages.length",
+                     "app.activeDocument.stories.length"])
+    """
+    if not expressions:
+        return _fmt({"success": False, "error": "expressions must contain at least one expression"})
+
+    err = await com.call_async(_check_connection)
+    if err:
+        return _fmt({"success": False, "error": err})
+
+    try:
+        values = await com.call_async(com.eval_exprs, expressions)
+    except Exception as e:
+        return _fmt({"success": False, "error": str(e)})
+    results = []
+    for value in values:
+        if isinstance(value, str) and value.startswith("ERROR: "):
+            results.append({"success": False, "error": value[7:]})
+        else:
+            results.append({"success": True, "result": value})
+    return _fmt({"success": True, "results": results})
+
+
 # ---------------------------------------------------------------------------
 # Tool 5: undo
 # ---------------------------------------------------------------------------
@@ -715,7 +877,7 @@ __result = {steps_undone: results.length, labels: results};
 
 
 @mcp.tool()
-def undo(steps: int = 1) -> str:
+async def undo(steps: int = 1) -> str:
     """Undo the last operation(s) in the active InDesign document.
 
     Each run_jsx call with undo_mode='entire' creates a single undo step.
@@ -724,7 +886,7 @@ def undo(steps: int = 1) -> str:
     Args:
         steps: Number of undo steps to perform (default: 1)
     """
-    err = _check_document()
+    err = await com.call_async(_check_document)
     if err:
         return _fmt({"success": False, "error": err})
 
@@ -733,7 +895,7 @@ def undo(steps: int = 1) -> str:
     jsx = _UNDO_JSX_TEMPLATE.replace("$STEPS$", str(steps))
 
     try:
-        result = com.run_jsx(jsx, undo_mode="none")
+        result = await com.call_async(com.run_jsx, jsx, undo_mode="none")
         return _fmt(_unwrap_result(result))
     except Exception as e:
         return _fmt({"success": False, "error": str(e)})
@@ -772,20 +934,12 @@ def report_learning(
         return _fmt({"success": False, "error": "problem must not be empty"})
     if not solution.strip():
         return _fmt({"success": False, "error": "solution must not be empty"})
-    if category not in ALLOWED_LEARNING_CATEGORIES:
-        return _fmt(
-            {
-                "success": False,
-                "error": f"category must be one of: {sorted(ALLOWED_LEARNING_CATEGORIES)}",
-            }
-        )
-    if severity not in ALLOWED_LEARNING_SEVERITIES:
-        return _fmt(
-            {
-                "success": False,
-                "error": f"severity must be one of: {sorted(ALLOWED_LEARNING_SEVERITIES)}",
-            }
-        )
+    err = _validate_choice(category, ALLOWED_LEARNING_CATEGORIES, _CATEGORY_ERROR)
+    if err:
+        return err
+    err = _validate_choice(severity, ALLOWED_LEARNING_SEVERITIES, _SEVERITY_ERROR)
+    if err:
+        return err
 
     cleaned_triggers = [str(t).strip() for t in triggers if str(t).strip()]
     if not cleaned_triggers:
@@ -795,23 +949,16 @@ def report_learning(
     normalized_solution = _normalize_text(solution)
     normalized_trigger_set = {str(t).strip().lower() for t in cleaned_triggers}
 
-    for existing in _load_gotcha_entries():
-        existing_problem = _normalize_text(str(existing.get("problem", "")))
-        existing_solution = _normalize_text(str(existing.get("solution", "")))
-        existing_triggers = existing.get("triggers", [])
-        existing_trigger_set = {
-            str(t).strip().lower() for t in existing_triggers if str(t).strip()
-        } if isinstance(existing_triggers, list) else set()
-        same_problem = normalized_problem and normalized_problem == existing_problem
-        same_solution = normalized_solution and normalized_solution == existing_solution
-        trigger_overlap = bool(normalized_trigger_set and existing_trigger_set and normalized_trigger_set & existing_trigger_set)
-        if same_problem or (same_solution and trigger_overlap):
+    for existing in _load_gotchas():
+        same_problem = normalized_problem and normalized_problem == existing.norm_problem
+        same_solution = normalized_solution and normalized_solution == existing.norm_solution
+        if same_problem or (same_solution and not normalized_trigger_set.isdisjoint(existing.trigger_set)):
             return _fmt(
                 {
                     "success": True,
                     "duplicate": True,
                     "message": "Equivalent gotcha already exists; skipping new submission.",
-                    "existing_id": existing.get("id"),
+                    "existing_id": existing.raw.get("id"),
                 }
             )
 
@@ -828,9 +975,7 @@ def report_learning(
     }
 
     try:
-        SUBMISSIONS_DIR.mkdir(parents=True, exist_ok=True)
-        with SUBMISSIONS_PATH.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(submission, ensure_ascii=False) + "\n")
+        _queue_submission(json.dumps(submission, ensure_ascii=False) + "\n")
     except Exception as e:
         return _fmt({"success": False, "error": f"failed to persist submission: {e}"})
 
@@ -863,43 +1008,34 @@ def get_gotchas(
         min_severity: Minimum severity to include: tip|warning|blocker (default: tip).
         top_n: Optional maximum number of entries to return.
     """
-    if min_severity not in ALLOWED_LEARNING_SEVERITIES:
-        return _fmt(
-            {
-                "success": False,
-                "error": f"min_severity must be one of: {sorted(ALLOWED_LEARNING_SEVERITIES)}",
-            }
-        )
+    err = _validate_choice(min_severity, ALLOWED_LEARNING_SEVERITIES, _MIN_SEVERITY_ERROR)
+    if err:
+        return err
     if top_n is not None and top_n <= 0:
         return _fmt({"success": False, "error": "top_n must be > 0 when provided"})
 
-    entries = _load_gotcha_entries()
     min_rank = SEVERITY_RANK[min_severity]
-    filtered_entries = [
-        entry
-        for entry in entries
-        if SEVERITY_RANK.get(str(entry.get("severity", "tip")).lower(), 0) >= min_rank
-    ]
+    filtered = [gotcha for gotcha in _load_gotchas() if gotcha.severity_rank >= min_rank]
 
     if not context:
         if top_n is not None:
-            filtered_entries = filtered_entries[:top_n]
+            filtered = filtered[:top_n]
         return _fmt(
             {
                 "success": True,
                 "min_severity": min_severity,
-                "count": len(filtered_entries),
-                "entries": filtered_entries,
+                "count": len(filtered),
+                "entries": [gotcha.raw for gotcha in filtered],
             }
         )
 
     lowered_context = context.lower()
     tokens = _context_tokens(context)
     scored: list[tuple[int, dict]] = []
-    for entry in filtered_entries:
-        score = _score_gotcha_for_context(entry, lowered_context, tokens)
+    for gotcha in filtered:
+        score = _score_gotcha_for_context(gotcha, lowered_context, tokens)
         if score > 0:
-            scored.append((score, entry))
+            scored.append((score, gotcha.raw))
 
     scored.sort(key=lambda item: item[0], reverse=True)
     ranked_entries = [entry for _, entry in scored]
@@ -1200,6 +1336,8 @@ _QUICK_REFERENCE = """\
   - Use everyItem() for bulk ops (see Collection Patterns in server instructions)
 """
 
+_COMMUNITY_GOTCHAS_HEADER = "\n## Community Gotchas (from gotchas.json)\n"
+
 
 @mcp.tool()
 def get_quick_reference() -> str:
@@ -1211,24 +1349,68 @@ def get_quick_reference() -> str:
     images, text, styles, geometry, transformations, layers, colors,
     find/change, export, and common gotchas.
     """
-    entries = _load_gotcha_entries()
-    community_lines = []
-    for entry in entries:
-        severity = str(entry.get("severity", "")).lower()
-        if severity not in {"blocker", "warning"}:
-            continue
-        problem = str(entry.get("problem", "")).strip()
-        solution = str(entry.get("solution", "")).strip()
-        entry_id = str(entry.get("id", "")).strip() or "unknown-id"
-        if not problem or not solution:
+    global _quick_reference_cache
+    mtime = _gotchas_mtime()
+    if _quick_reference_cache is not None and _quick_reference_cache[0] == mtime:
+        return _quick_reference_cache[1]
+    _quick_reference_cache = (mtime, _render_quick_reference(_load_gotchas()))
+    return _quick_reference_cache[1]
+
+
+def _render_quick_reference(gotchas: list[_Gotcha]) -> str:
+    """Append the community gotchas section to the static quick reference."""
+    min_rank = SEVERITY_RANK["warning"]
+    parts = [_QUICK_REFERENCE, _COMMUNITY_GOTCHAS_HEADER]
+    for gotcha in gotchas:
+        if gotcha.severity_rank < min_rank or not gotcha.problem or not gotcha.solution:
             continue
-        community_lines.append(f"  - [{severity}] {entry_id}: {problem} -> {solution}")
+        entry_id = gotcha.id or "unknown-id"
+        parts.append(f"  - [{gotcha.severity}] {entry_id}: {gotcha.problem} -> {gotcha.solution}\n")
 
-    if not community_lines:
+    if len(parts) == 2:
         return _QUICK_REFERENCE
+    return "".join(parts)
 
-    dynamic_section = "\n## Community Gotchas (from gotchas.json)\n" + "\n".join(community_lines) + "\n"
-    return _QUICK_REFERENCE + dynamic_section
+
+# ---------------------------------------------------------------------------
+# Tool 9: run_jsx_batch
+# ---------------------------------------------------------------------------
+
+@mcp.tool()
+async def run_jsx_batch(
+    codes: list[str],
+    undo_name: str = "Agent Batch",
+    undo_mode: str = "entire",
+) -> str:
+    """Execute several JSX snippets in InDesign with a single round-trip.
+
+    Each snippet follows the run_jsx conventions (assign to __result) and
+    runs in its own scope, in order. An error in one snippet is reported in
+    its slot without stopping the others. Use this instead of several
+    consecutive run_jsx calls to avoid paying the COM round-trip per call.
+
+    Returns {"success": true, "results": [...]} with one run_jsx-style
+    result per snippet.
+
+    Args:
+        codes: List of JSX snippets. Each assigns to __result to return data.
+        undo_name: Human-readable label for Edit > Undo (shared by all snippets)
+        undo_mode: "entire" groups all changes as one undo step (default),
+                   "auto" lets InDesign handle undo per-operation,
+                   "none" skips undo tracking (for read-only operations)
+    """
+    if not codes:
+        return _fmt({"success": False, "error": "codes must contain at least one snippet"})
+
+    err = await com.call_async(_check_connection)
+    if err:
+        return _fmt({"success": False, "error": err})
+
+    try:
+        result = await com.call_async(com.run_jsx_batch, codes, undo_name=undo_name, undo_mode=undo_mode)
+        return _fmt(result)
+    except Exception as e:
+        return _fmt({"success": False, "error": str(e), "name": type(e).__name__})
 
 
 # ---------------------------------------------------------------------------
@@ -1237,7 +1419,15 @@ def get_quick_reference() -> str:
 
 def main():
     """Run the MCP server via stdio transport."""
-    mcp.run(transport="stdio")
+    # Warm the gotcha caches so the first tool call doesn't pay for them.
+    _load_gotchas()
+    get_quick_reference()
+    # Attach to InDesign on the COM thread before the first request arrives.
+    com.submit(com.warm_up)
+    try:
+        mcp.run(transport="stdio")
+    finally:
+        com.shutdown()
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ Provides safe JSX execution in InDesign via Windows COM/OLE:
 - Undo grouping via UndoModes.ENTIRE_SCRIPT
 - DOM-safe JSON serialisation (no eval!)
 - Automatic connection management (GetActiveObject -> Dispatch fallback)
+- Registered operations compiled once into a persistent engine
 
 Attribution:
 - Safety patterns inspired by IdExtenso (Marc Autret, MIT): https://github.com/indiscripts/IdExtenso
@@ -19,16 +20,29 @@ Safety patterns:
 - UnitValue === null bug workaround
 """
 
+import asyncio
+import concurrent.futures
+import functools
 import json
 import logging
 import os
+import queue
+import re
+import tempfile
 import threading
 import time
 from pathlib import Path
 from typing import Any
 
+import pythoncom
 import pywintypes
 import win32com.client
+import win32com.client.gencache
+
+try:  # optional, faster JSON handling for large results
+    import orjson
+except ImportError:
+    orjson = None
 
 log = logging.getLogger("indesign_com")
 
@@ -44,35 +58,91 @@ UNDO_SCRIPT_REQUEST = 1699967573     # UndoModes.SCRIPT_REQUEST
 UNDO_AUTO = 1699963221               # UndoModes.AUTO_UNDO
 UNDO_FAST_ENTIRE = 1699964501        # UndoModes.FAST_ENTIRE_SCRIPT
 
+# Map run_jsx undo_mode to DoScript parameters:
+#   "entire" → ENTIRE_SCRIPT  (one undo step for everything, labelled)
+#   "auto"   → SCRIPT_REQUEST (InDesign creates one undo step per DOM change)
+#   "none"   → not listed: plain DoScript without undo params (default
+#              SCRIPT_REQUEST behaviour, but no extra undo grouping — safe
+#              for read-only queries and for the undo tool itself)
+_UNDO_MODES = {
+    "entire": UNDO_ENTIRE_SCRIPT,
+    "auto": UNDO_SCRIPT_REQUEST,
+}
+
 # ProgIDs to try, newest first
-PROGIDS = [
+PROGIDS = (
     "InDesign.Application.2026",
     "InDesign.Application.2025",
     "InDesign.Application",
-]
+)
 
 DEFAULT_TIMEOUT = int(os.environ.get("INDESIGN_EXEC_TIMEOUT", "30"))
+_TIMEOUT_NS = DEFAULT_TIMEOUT * 1_000_000_000
+
+# Empty withArguments array for DoScript, built once instead of letting
+# win32com convert a fresh [] into a SAFEARRAY on every call.
+_EMPTY_ARGS = win32com.client.VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_VARIANT, [])
 
 # ---------------------------------------------------------------------------
-# JSX Polyfill (loaded once from file, cached)
+# JSX Polyfill (ships next to this module; loaded once at import)
 # ---------------------------------------------------------------------------
 
 _POLYFILL_PATH = Path(__file__).parent / "json_polyfill.jsx"
-_polyfill_code: str | None = None
+_POLYFILL = _POLYFILL_PATH.read_text(encoding="utf-8")
+
+# Results longer than this (in characters) are written to a temp file by the JSX side and
+# only the path crosses COM (see __spillLarge / _load_spilled_result).
+LARGE_RESULT_CHARS = 65536
+_SPILL_PREFIX = "mcp_result_"
+# The JSX side writes into this process's temp folder rather than its own
+# Folder.temp (the two differ when the server runs with its own TEMP);
+# spill files anywhere else are never touched.
+_SPILL_DIR = Path(tempfile.gettempdir()).resolve()
+
+_SPILL_JSX = (
+    "\nfunction __spillLarge(json) {\n"
+    f"    if (json.length <= {LARGE_RESULT_CHARS}) return json;\n"
+    "    try {\n"
+    f"        var f = new File({json.dumps(_SPILL_DIR.as_posix())} + '/{_SPILL_PREFIX}' + (new Date()).getTime() + '_'\n"
+    "            + Math.floor(Math.random() * 1e9) + '.json');\n"
+    "        f.encoding = 'UTF-8';\n"
+    "        f.lineFeed = 'Unix';\n"
+    "        if (!f.open('w')) return json;\n"
+    "        var ok = f.write(json);\n"
+    "        f.close();\n"
+    "        if (!ok) { f.remove(); return json; }\n"
+    "        return '{\"__file\":' + __jsonStr(f.fsName) + '}';\n"
+    "    } catch (spillErr) {\n"
+    "        return json;\n"
+    "    }\n"
+    "}\n"
+)
+
 
+def _minify_jsx(source: str) -> str:
+    """Strip full-line ``//`` comments, indentation and blank lines.
+
+    Deliberately line-based: line breaks are kept, so automatic semicolon
+    insertion and trailing ``//`` comments behave exactly as in the
+    original source.  Set ``DEBUG_JSX=1`` to ship the unminified text.
+    """
+    if os.environ.get("DEBUG_JSX") == "1":
+        return source
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
 
-def _get_polyfill() -> str:
-    """Load the JSON polyfill / __safeStringify code from file (cached)."""
-    global _polyfill_code
-    if _polyfill_code is None:
-        _polyfill_code = _POLYFILL_PATH.read_text(encoding="utf-8")
-    return _polyfill_code
+
+# Everything the wrapper, batch and engine scripts need before user code.
+# Minified once at import: it is resent (and re-parsed by ExtendScript)
+# with every non-engine DoScript call.
+_PRELUDE = _minify_jsx(_POLYFILL + _SPILL_JSX)
 
 
 # ---------------------------------------------------------------------------
 # JSX Wrapper
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=256)
 def _build_wrapper(user_code: str) -> str:
     """Build the full JSX wrapper around user code.
 
@@ -89,48 +159,200 @@ def _build_wrapper(user_code: str) -> str:
 
         var doc = app.activeDocument;
         __result = {name: doc.name, pages: doc.pages.length};
+
+    Results are memoised, since agents often resend identical snippets.
     """
-    polyfill = _get_polyfill()
+    return "".join((_WRAPPER_HEAD, user_code, _WRAPPER_TAIL))
+
+
+# Function body around user code; shared by the run_jsx IIFE and the
+# handlers of the persistent engine (see run_registered).
+_WRAPPER_PROLOGUE = (
+    "var __result;\n"
+    "var __uilevel = app.scriptPreferences.userInteractionLevel;\n"
+    "app.scriptPreferences.userInteractionLevel = UserInteractionLevels.neverInteract;\n"
+    "try {\n"
+)
+# === USER CODE (assigns to __result) goes between prologue and epilogue ===
+_WRAPPER_EPILOGUE = (
+    "\n"
+    "app.scriptPreferences.userInteractionLevel = __uilevel;\n"
+    "if (typeof __result === 'undefined') {\n"
+    "    return __safeStringify({success: true, result: null});\n"
+    "}\n"
+    # Primitive fast path: encode the value directly instead of walking the
+    # envelope object.  typeof only, as `=== null` misfires on UnitValue.
+    "var __t = typeof __result;\n"
+    "if (__t === 'number' || __t === 'string' || __t === 'boolean') {\n"
+    "    return __spillLarge('{\"success\":true,\"result\":' + __jsonEncode(__result, 0, []) + '}');\n"
+    "}\n"
+    "try {\n"
+    "    return __spillLarge(__safeStringify({success: true, result: __result}));\n"
+    "} catch(jsonErr) {\n"
+    "    return __spillLarge(__safeStringify({success: true, result: String(__result)}));\n"
+    "}\n"
+    "} catch(e) {\n"
+    "try { app.scriptPreferences.userInteractionLevel = __uilevel; } catch(x) {}\n"
+    "return __safeStringify({\n"
+    "    success: false,\n"
+    "    error: e.message || String(e),\n"
+    "    name: e.name || 'Error',\n"
+    "    line: typeof e.line === 'number' ? e.line : -1\n"
+    "});\n"
+    "}\n"
+)
+
+# The IIFE ensures a clean scope and allows explicit ``return``.
+# DoScript returns the value of the last expression — the IIFE call.
+_WRAPPER_HEAD = _PRELUDE + "\n(function() {\n" + _WRAPPER_PROLOGUE
+_WRAPPER_TAIL = _WRAPPER_EPILOGUE + "})();\n"
+
+
+def _build_batch_wrapper(codes: list[str]) -> str:
+    """Build one JSX script that runs several user snippets in order.
+
+    Each snippet gets its own IIFE scope, ``__result`` variable and
+    try/catch, so a failing snippet is reported without aborting the
+    others.  Every snippet is serialised exactly as in ``_build_wrapper``;
+    the outer function joins the per-snippet JSON strings into
+    ``{success: true, results: [...]}``.
+    """
+    parts = [_BATCH_HEAD]
+    for code in codes:
+        parts.append(_BATCH_ITEM_HEAD)
+        parts.append(code)
+        parts.append(_BATCH_ITEM_TAIL)
+    parts.append(_BATCH_TAIL)
+    return "".join(parts)
+
+
+_BATCH_HEAD = (
+    _PRELUDE + "\n"
+    "(function() {\n"
+    "var __results = [];\n"
+    "var __uilevel = app.scriptPreferences.userInteractionLevel;\n"
+    "app.scriptPreferences.userInteractionLevel = UserInteractionLevels.neverInteract;\n"
+    "try {\n"
+)
+_BATCH_ITEM_HEAD = (
+    "__results.push((function() {\n"
+    "var __result;\n"
+    "try {\n"
+)
+_BATCH_ITEM_TAIL = (
+    "\n"
+    "} catch(e) {\n"
+    "return __safeStringify({\n"
+    "    success: false,\n"
+    "    error: e.message || String(e),\n"
+    "    name: e.name || 'Error',\n"
+    "    line: typeof e.line === 'number' ? e.line : -1\n"
+    "});\n"
+    "}\n"
+    "if (typeof __result === 'undefined') {\n"
+    "    return __safeStringify({success: true, result: null});\n"
+    "}\n"
+    # Primitive fast path: encode the value directly instead of walking the
+    # envelope object.  typeof only, as `=== null` misfires on UnitValue.
+    "var __t = typeof __result;\n"
+    "if (__t === 'number' || __t === 'string' || __t === 'boolean') {\n"
+    "    return '{\"success\":true,\"result\":' + __jsonEncode(__result, 0, []) + '}';\n"
+    "}\n"
+    "try {\n"
+    "    return __safeStringify({success: true, result: __result});\n"
+    "} catch(jsonErr) {\n"
+    "    return __safeStringify({success: true, result: String(__result)});\n"
+    "}\n"
+    "})());\n"
+)
+_BATCH_TAIL = (
+    "app.scriptPreferences.userInteractionLevel = __uilevel;\n"
+    "return __spillLarge('{\"success\":true,\"results\":[' + __results.join(',') + ']}');\n"
+    "} catch(e) {\n"
+    "try { app.scriptPreferences.userInteractionLevel = __uilevel; } catch(x) {}\n"
+    "return __safeStringify({\n"
+    "    success: false,\n"
+    "    error: e.message || String(e),\n"
+    "    name: e.name || 'Error',\n"
+    "    line: typeof e.line === 'number' ? e.line : -1,\n"
+    "    completed: __results.length\n"
+    "});\n"
+    "}\n"
+    "})();\n"
+)
+
+
+# ---------------------------------------------------------------------------
+# Persistent engine (registered operations)
+# ---------------------------------------------------------------------------
+#
+# Operations registered with register_operation() are compiled once into a
+# persistent ExtendScript engine (#targetengine) together with the polyfill.
+# run_registered() then only ships a one-line dispatch script per call.
+
+ENGINE_NAME = "mcp"
+_ENGINE_NOT_READY = "__MCP_ENGINE_NOT_READY__"
+_OPERATION_NAME_RE = re.compile(r"[A-Za-z_]\w*")
+
+_operations: dict[str, str] = {}
+_operations_version = 0
+_engine_unavailable = False
+
+
+def register_operation(name: str, code: str):
+    """Register JSX code as a named operation for run_registered().
 
-    # The IIFE ensures a clean scope and allows explicit ``return``.
-    # DoScript returns the value of the last expression — the IIFE call.
+    ``code`` follows the run_jsx conventions (assign to ``__result``) and can
+    read its arguments from ``__args``.  Re-registering a name replaces it.
+    """
+    global _operations_version
+    if not _OPERATION_NAME_RE.fullmatch(name):
+        raise ValueError(f"Invalid operation name: {name!r}")
+    _operations[name] = code
+    _operations_version += 1
+
+
+def _engine_token() -> str:
+    """Identify this process's operation set inside the shared engine."""
+    return f"{os.getpid()}-{_operations_version}"
+
+
+def _build_engine_bootstrap() -> str:
+    """Build the script that installs the polyfill and all handlers."""
+    parts = [
+        f'#targetengine "{ENGINE_NAME}"\n',
+        _PRELUDE,
+        f"\nvar __mcp = {{token: '{_engine_token()}', handlers: {{}}}};\n",
+    ]
+    for name, code in _operations.items():
+        parts.append(f"__mcp.handlers['{name}'] = function(__args) {{\n")
+        parts.append(_WRAPPER_PROLOGUE)
+        parts.append(code)
+        parts.append(_WRAPPER_EPILOGUE)
+        parts.append("};\n")
+    parts.append("'ok';\n")
+    return "".join(parts)
+
+
+def _build_dispatch(op: str, args_json: str) -> str:
+    """Build the short script that calls a registered handler."""
     return (
-        polyfill + "\n"
-        "(function() {\n"
-        "var __result;\n"
-        "var __uilevel = app.scriptPreferences.userInteractionLevel;\n"
-        "app.scriptPreferences.userInteractionLevel = UserInteractionLevels.neverInteract;\n"
-        "try {\n"
-        # === USER CODE (assigns to __result) ===
-        + user_code + "\n"
-        # === END USER CODE ===
-        "app.scriptPreferences.userInteractionLevel = __uilevel;\n"
-        "if (typeof __result === 'undefined') {\n"
-        "    return __safeStringify({success: true, result: null});\n"
-        "}\n"
-        "try {\n"
-        "    return __safeStringify({success: true, result: __result});\n"
-        "} catch(jsonErr) {\n"
-        "    return __safeStringify({success: true, result: String(__result)});\n"
-        "}\n"
-        "} catch(e) {\n"
-        "try { app.scriptPreferences.userInteractionLevel = __uilevel; } catch(x) {}\n"
-        "return __safeStringify({\n"
-        "    success: false,\n"
-        "    error: e.message || String(e),\n"
-        "    name: e.name || 'Error',\n"
-        "    line: typeof e.line === 'number' ? e.line : -1\n"
-        "});\n"
-        "}\n"
-        "})();\n"
+        f'#targetengine "{ENGINE_NAME}"\n'
+        f"(typeof __mcp === 'undefined' || __mcp.token !== '{_engine_token()}'"
+        f" || !__mcp.handlers.hasOwnProperty('{op}'))"
+        f" ? '{_ENGINE_NOT_READY}' : __mcp.handlers['{op}']({args_json});\n"
     )
 
 
-# Simple expression evaluator (no undo, no full wrapper)
-_JSX_EVAL_TEMPLATE = (
+# Simple expression evaluator (no undo, no full wrapper).
+# The expression is spliced between head and tail.
+_EVAL_HEAD = (
     "(function() {\n"
     "    try {\n"
-    "        var __r = $EXPRESSION$;\n"
+    "        var __r = "
+)
+_EVAL_TAIL = (
+    ";\n"
     "        if (typeof __r === 'undefined') return 'undefined';\n"
     "        if (__r === null) return 'null';\n"
     "        return String(__r);\n"
@@ -140,65 +362,292 @@ _JSX_EVAL_TEMPLATE = (
     "})();\n"
 )
 
+# Plain property paths (``app.activeDocument.pages.length``) can't contain
+# statements or comma expressions, so they use a one-line script with the
+# same result: String() already maps undefined/null to 'undefined'/'null'.
+_SIMPLE_EXPR_RE = re.compile(r"[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*")
+_EVAL_SIMPLE_HEAD = "(function(){try{return String("
+_EVAL_SIMPLE_TAIL = ");}catch(e){return 'ERROR: '+(e.message||String(e));}})();"
+
+# Several expressions in one DoScript: each runs in its own try/catch so a
+# failing expression yields its 'ERROR: ...' string without affecting the
+# rest; the strings travel back as one JSON array.
+_EVAL_MANY_HEAD = _PRELUDE + "(function() {\nvar __r = [];\n"
+_EVAL_MANY_ITEM_HEAD = "__r.push((function(){try{return String(\n"
+_EVAL_MANY_ITEM_TAIL = "\n);}catch(e){return 'ERROR: '+(e.message||String(e));}})());\n"
+_EVAL_MANY_TAIL = (
+    "for (var i = 0; i < __r.length; i++) __r[i] = __jsonStr(__r[i]);\n"
+    "return '[' + __r.join(',') + ']';\n"
+    "})();\n"
+)
+
 
 # ---------------------------------------------------------------------------
 # Connection Management
 # ---------------------------------------------------------------------------
 
+# All COM traffic runs on one worker thread (see _ComWorker), which owns the
+# COM apartment and the single Application proxy below.  Nothing else
+# touches _app, so it needs no lock and dropping it affects every caller.
 _app = None
-_app_lock = threading.Lock()
+_last_probe = 0.0
+_last_good_progid: str | None = None
+_PROBE_TTL_S = 1.0
+
+_worker_state = threading.local()
+
+
+class _ComWorker:
+    """The one thread that talks to InDesign.
+
+    Calls from any thread are queued and run strictly in order, so scripts
+    never overlap in InDesign and an undo cannot overtake the script it is
+    meant to revert.  The thread initialises COM when it starts; shutdown()
+    releases the connection and uninitialises COM.
+
+    Cancelling a returned future only works while it is still queued; a
+    script that already runs cannot be aborted (see _execute_with_undo).
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> concurrent.futures.Future:
+        """Queue fn(*args, **kwargs) and return a future for its result."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="com-worker", daemon=True)
+                self._thread.start()
+            self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def shutdown(self):
+        """Run the queued calls, then release InDesign and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def _work(self):
+        global _app
+        _worker_state.active = True
+        pythoncom.CoInitialize()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            _app = None
+            pythoncom.CoUninitialize()
+
+
+_worker = _ComWorker()
+
+
+def _on_com_thread(fn):
+    """Make fn run on the COM worker thread; other threads wait for it."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(_worker_state, "active", False):
+            return fn(*args, **kwargs)
+        return _worker.submit(fn, *args, **kwargs).result()
+
+    return wrapper
 
 
+def submit(fn, *args, **kwargs) -> concurrent.futures.Future:
+    """Queue fn(*args, **kwargs) on the COM worker thread without waiting."""
+    return _worker.submit(fn, *args, **kwargs)
+
+
+async def call_async(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the COM worker thread.
+
+    Lets an asyncio event loop keep serving requests while InDesign works.
+    """
+    return await asyncio.wrap_future(_worker.submit(fn, *args, **kwargs))
+
+
+def shutdown():
+    """Finish queued COM calls, release InDesign and uninitialise COM."""
+    _worker.shutdown()
+
+
+@_on_com_thread
 def connect() -> Any:
     """Connect to a running InDesign instance.
 
     Tries GetActiveObject first (attach to existing), falls back to Dispatch.
     Does NOT launch InDesign if not running (Dispatch may do so — we check after).
+    The connection is cached on the COM worker thread; use the returned
+    object only there (e.g. in a function passed to submit()).
 
     Returns the COM Application object.
     Raises ConnectionError if InDesign is not reachable.
     """
+    global _app, _last_probe, _last_good_progid
+    # Test existing connection.  A handle probed within the last
+    # _PROBE_TTL_S is trusted as-is; if it died meanwhile, the failing
+    # DoScript invalidates it via _com_error_to_dict.
+    if _app is not None:
+        now = time.monotonic()
+        if now - _last_probe < _PROBE_TTL_S:
+            return _app
+        try:
+            _ = _app.Name  # Quick connectivity check
+            _last_probe = now
+            return _app
+        except Exception:
+            _app = None  # Connection lost, try reconnect
+
+    last_error = None
+    # Reconnects usually hit the same version again, so try that one first.
+    if _last_good_progid is not None:
+        prog_ids = (_last_good_progid,) + tuple(p for p in PROGIDS if p != _last_good_progid)
+    else:
+        prog_ids = PROGIDS
+    for prog_id in prog_ids:
+        app, error = _try_progid(prog_id)
+        if app is not None:
+            _last_good_progid = prog_id
+            _app = _early_bound(app)
+            _last_probe = time.monotonic()
+            return _app
+        last_error = error
+
+    raise ConnectionError(
+        f"Could not connect to InDesign. Is it running? Last error: {last_error}"
+    )
+
+
+def _try_progid(prog_id: str) -> tuple[Any, Exception | None]:
+    """Attach to (or dispatch) one ProgID. Returns (app or None, last error)."""
+    # Try attaching to running instance first
+    try:
+        return win32com.client.GetActiveObject(prog_id), None
+    except pywintypes.com_error:
+        pass
+
+    # Try Dispatch (may launch InDesign)
+    try:
+        app = win32com.client.Dispatch(prog_id)
+        # Verify it's actually running by checking a property
+        _ = app.Name
+        return app, None
+    except pywintypes.com_error as e:
+        return None, e
+
+
+def _early_bound(app):
+    """Return a makepy (early-bound) wrapper for app, or app itself.
+
+    Early binding calls DoScript by DISPID instead of resolving the name
+    via GetIDsOfNames on every call.  Generating the wrapper module for
+    InDesign's large type library takes a while, so it never runs on the
+    COM worker: until the module exists, app stays late-bound and
+    _generate_wrapper builds the module on its own thread.
+    """
+    try:
+        attr = app._oleobj_.GetTypeInfo().GetContainingTypeLib()[0].GetLibAttr()
+        typelib = (attr[0], attr[1], attr[3], attr[4])  # GUID, LCID, major, minor
+    except Exception as e:
+        log.debug("Early binding unavailable, using late binding: %s", e)
+        return app
+    try:
+        win32com.client.gencache.GetModuleForTypelib(*typelib)
+    except Exception:
+        _start_wrapper_generation(typelib)
+        return app
+    try:
+        return win32com.client.gencache.EnsureDispatch(app)
+    except Exception as e:
+        log.debug("Early binding unavailable, using late binding: %s", e)
+        return app
+
+
+_makepy_lock = threading.Lock()
+_makepy_started = False
+
+
+def _start_wrapper_generation(typelib: tuple) -> None:
+    """Generate the makepy module for typelib on a background thread (once)."""
+    global _makepy_started
+    with _makepy_lock:
+        if _makepy_started:
+            return
+        _makepy_started = True
+    threading.Thread(target=_generate_wrapper, args=(typelib,), name="com-makepy", daemon=True).start()
+
+
+def _generate_wrapper(typelib: tuple) -> None:
+    """Build the makepy module, then let the COM worker switch to early binding."""
+    pythoncom.CoInitialize()
+    try:
+        win32com.client.gencache.EnsureModule(*typelib)
+    except Exception as e:
+        log.debug("Early binding unavailable, using late binding: %s", e)
+        return
+    finally:
+        pythoncom.CoUninitialize()
+    _worker.submit(_adopt_early_bound)
+
+
+def _adopt_early_bound() -> None:
+    """Swap the cached late-bound _app for its early-bound wrapper (COM worker)."""
     global _app
+    if _app is not None:
+        _app = _early_bound(_app)
 
-    with _app_lock:
-        # Test existing connection
-        if _app is not None:
-            try:
-                _ = _app.Name  # Quick connectivity check
-                return _app
-            except Exception:
-                _app = None  # Connection lost, try reconnect
 
-        last_error = None
+@_on_com_thread
+def warm_up():
+    """Attach to a running InDesign and start generating its early-binding wrapper.
+
+    Never launches InDesign and swallows all errors; queue it with
+    submit(warm_up) at startup so the first request finds the connection.
+    The wrapper is built off the COM worker (see _early_bound), so requests
+    never wait for it.
+    """
+    global _app, _last_probe, _last_good_progid
+    if _app is not None:
+        return
+    try:
         for prog_id in PROGIDS:
-            # Try attaching to running instance first
             try:
-                _app = win32com.client.GetActiveObject(prog_id)
-                return _app
+                app = win32com.client.GetActiveObject(prog_id)
             except pywintypes.com_error:
-                pass
-
-            # Try Dispatch (may launch InDesign)
-            try:
-                _app = win32com.client.Dispatch(prog_id)
-                # Verify it's actually running by checking a property
-                _ = _app.Name
-                return _app
-            except pywintypes.com_error as e:
-                last_error = e
-
-        raise ConnectionError(
-            f"Could not connect to InDesign. Is it running? Last error: {last_error}"
-        )
+                continue
+            _app = _early_bound(app)
+            _last_probe = time.monotonic()
+            _last_good_progid = prog_id
+            return
+    except Exception as e:
+        log.debug("COM warm-up skipped: %s", e)
 
 
+@_on_com_thread
 def disconnect():
     """Release the COM connection."""
-    global _app
-    with _app_lock:
-        _app = None
+    global _app, _engine_unavailable
+    _app = None
+    _engine_unavailable = False
+    _build_wrapper.cache_clear()
 
 
+@_on_com_thread
 def is_connected() -> bool:
     """Check if we have a live connection to InDesign."""
     global _app
@@ -216,6 +665,7 @@ def is_connected() -> bool:
 # JSX Execution (public API)
 # ---------------------------------------------------------------------------
 
+@_on_com_thread
 def run_jsx(
     code: str,
     undo_name: str = "Agent Script",
@@ -240,22 +690,86 @@ def run_jsx(
 
     # Build the safe JSX wrapper (IIFE, no eval)
     wrapped = _build_wrapper(code)
+    return _run_wrapped(app, wrapped, undo_name, undo_mode)
 
-    # Map undo_mode to DoScript parameters:
-    #   "entire" → ENTIRE_SCRIPT  (one undo step for everything, labelled)
-    #   "auto"   → SCRIPT_REQUEST (InDesign creates one undo step per DOM change)
-    #   "none"   → plain DoScript without undo params (default SCRIPT_REQUEST
-    #              behaviour, but no extra undo grouping — safe for read-only
-    #              queries and for the undo tool itself)
-    if undo_mode == "entire":
-        return _execute_with_undo(app, wrapped, undo_name, UNDO_ENTIRE_SCRIPT)
-    elif undo_mode == "auto":
-        return _execute_with_undo(app, wrapped, undo_name, UNDO_SCRIPT_REQUEST)
-    else:
+
+@_on_com_thread
+def run_jsx_batch(
+    codes: list[str],
+    undo_name: str = "Agent Batch",
+    undo_mode: str = "entire",
+    timeout: int | None = None,
+) -> dict:
+    """Execute several JSX snippets in a single DoScript round-trip.
+
+    Each snippet follows the ``run_jsx`` conventions (assign to
+    ``__result``) and runs in its own scope; an error in one snippet does
+    not stop the following ones.  All changes share one undo step when
+    ``undo_mode`` is ``"entire"``.
+
+    Returns:
+        ``{success: True, results: [...]}`` with one ``run_jsx``-style dict
+        per snippet, or a single error dict if the batch itself failed
+        (e.g. a COM error or a syntax error in any snippet).
+    """
+    app = connect()
+    wrapped = _build_batch_wrapper(codes)
+    return _run_wrapped(app, wrapped, undo_name, undo_mode)
+
+
+@_on_com_thread
+def run_registered(
+    op: str,
+    args: dict | None = None,
+    undo_name: str = "Agent Script",
+    undo_mode: str = "entire",
+) -> dict:
+    """Run an operation registered with register_operation().
+
+    The handlers live in the persistent ``ENGINE_NAME`` engine, so only a
+    short dispatch script crosses COM.  The engine is (re)installed on
+    first use, after InDesign restarts, or when the operation set changed.
+    If InDesign does not keep the engine alive, operations fall back to
+    regular run_jsx calls for the rest of the session.
+
+    Returns the same structure as run_jsx.
+    """
+    global _engine_unavailable
+    code = _operations.get(op)
+    if code is None:
+        raise KeyError(f"Unknown operation: {op}")
+    # ensure_ascii keeps U+2028/U+2029 escaped, which ES3 literals reject.
+    args_json = json.dumps(args or {})
+    if not _engine_unavailable:
+        app = connect()
+        dispatch = _build_dispatch(op, args_json)
+        result = _run_wrapped(app, dispatch, undo_name, undo_mode)
+        if not _engine_missing(result):
+            return result
+        _execute_raw(app, _build_engine_bootstrap())
+        result = _run_wrapped(app, dispatch, undo_name, undo_mode)
+        if not _engine_missing(result):
+            return result
+        log.warning("Persistent engine '%s' unavailable; using inline scripts.", ENGINE_NAME)
+        _engine_unavailable = True
+    return run_jsx(f"var __args = {args_json};\n{code}", undo_name=undo_name, undo_mode=undo_mode)
+
+
+def _engine_missing(result) -> bool:
+    """True if a dispatch script reported that the engine needs bootstrapping."""
+    return isinstance(result, dict) and result.get("result") == _ENGINE_NOT_READY
+
+
+def _run_wrapped(app, wrapped: str, undo_name: str, undo_mode: str) -> dict:
+    """Run an already wrapped script with the requested undo behaviour."""
+    mode = _UNDO_MODES.get(undo_mode)
+    if mode is None:
         # "none" or unknown → plain 2-param DoScript (no undo grouping)
         return _execute(app, wrapped)
+    return _execute_with_undo(app, wrapped, undo_name, mode)
 
 
+@_on_com_thread
 def eval_expr(expression: str, timeout: int | None = None) -> str:
     """Evaluate a simple expression in InDesign.
 
@@ -263,10 +777,40 @@ def eval_expr(expression: str, timeout: int | None = None) -> str:
     For quick read-only queries (e.g. ``app.activeDocument.pages.length``).
     """
     app = connect()
-    jsx = _JSX_EVAL_TEMPLATE.replace("$EXPRESSION$", expression)
+    if _SIMPLE_EXPR_RE.fullmatch(expression):
+        jsx = "".join((_EVAL_SIMPLE_HEAD, expression, _EVAL_SIMPLE_TAIL))
+    else:
+        jsx = "".join((_EVAL_HEAD, expression, _EVAL_TAIL))
     return _execute_raw(app, jsx)
 
 
+@_on_com_thread
+def eval_exprs(expressions: list[str]) -> list[str]:
+    """Evaluate several expressions in a single DoScript call.
+
+    Returns one string per expression, in order, with the same conventions
+    as ``eval_expr`` (``'ERROR: ...'`` for an expression that throws).
+    If the call itself fails, every entry is the JSON error string.
+    """
+    if not expressions:
+        return []
+    app = connect()
+    parts = [_EVAL_MANY_HEAD]
+    for expression in expressions:
+        parts.append(_EVAL_MANY_ITEM_HEAD)
+        parts.append(expression)
+        parts.append(_EVAL_MANY_ITEM_TAIL)
+    parts.append(_EVAL_MANY_TAIL)
+    raw = _execute_raw(app, "".join(parts))
+    try:
+        values = _json_loads(raw)
+    except (TypeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(expressions):
+        return [str(raw)] * len(expressions)
+    return values
+
+
 # ---------------------------------------------------------------------------
 # Internal Execution
 # ---------------------------------------------------------------------------
@@ -291,20 +835,20 @@ def _execute_with_undo(app, jsx_code: str, undo_name: str,
     Instead we measure wall-clock time and emit a warning when execution
     exceeds DEFAULT_TIMEOUT.
     """
-    t0 = time.monotonic()
+    t0 = time.perf_counter_ns()
     try:
         result = app.DoScript(
             jsx_code,
             SCRIPT_LANGUAGE_JAVASCRIPT,
-            [],                    # withArguments (empty)
+            _EMPTY_ARGS,           # withArguments (empty)
             undo_mode,             # UndoModes enum value
             undo_name,
         )
-        elapsed = time.monotonic() - t0
-        if elapsed > DEFAULT_TIMEOUT:
-            log.warning("DoScript took %.1fs (timeout hint: %ds)", elapsed, DEFAULT_TIMEOUT)
+        elapsed_ns = time.perf_counter_ns() - t0
+        if elapsed_ns > _TIMEOUT_NS:
+            log.warning("DoScript took %.1fs (timeout hint: %ds)", elapsed_ns / 1e9, DEFAULT_TIMEOUT)
         parsed = _parse_result(result)
-        parsed["_elapsed_s"] = round(elapsed, 2)
+        parsed["_elapsed_s"] = round(elapsed_ns / 1e9, 2)
         return parsed
     except pywintypes.com_error as e:
         return _com_error_to_dict(e)
@@ -317,16 +861,16 @@ def _execute_raw(app, jsx_code: str) -> str | None:
     Raises no exceptions — COM errors are converted to JSON error strings.
     Used by eval_expr() for lightweight queries.
     """
-    t0 = time.monotonic()
+    t0 = time.perf_counter_ns()
     try:
         result = app.DoScript(jsx_code, SCRIPT_LANGUAGE_JAVASCRIPT)
-        elapsed = time.monotonic() - t0
-        if elapsed > DEFAULT_TIMEOUT:
-            log.warning("DoScript (raw) took %.1fs (timeout hint: %ds)", elapsed, DEFAULT_TIMEOUT)
+        elapsed_ns = time.perf_counter_ns() - t0
+        if elapsed_ns > _TIMEOUT_NS:
+            log.warning("DoScript (raw) took %.1fs (timeout hint: %ds)", elapsed_ns / 1e9, DEFAULT_TIMEOUT)
         return result
     except pywintypes.com_error as e:
         # Return a JSON error string so callers always get parseable output
-        return json.dumps(_com_error_to_dict(e))
+        return _json_dumps(_com_error_to_dict(e))
 
 
 # ---------------------------------------------------------------------------
@@ -339,13 +883,75 @@ def _parse_result(raw) -> dict:
         return {"success": True, "result": None}
     if isinstance(raw, str):
         try:
-            return json.loads(raw)
+            parsed = _json_loads(raw)
         except (json.JSONDecodeError, ValueError):
             return {"success": True, "result": raw}
+        if isinstance(parsed, dict) and len(parsed) == 1 and "__file" in parsed:
+            return _load_spilled_result(parsed["__file"])
+        return parsed
     # COM may return tuples (from JS arrays), ints, bools, etc.
     return {"success": True, "result": raw}
 
 
+def _load_spilled_result(path) -> dict:
+    """Read (and delete) a large result that the JSX side wrote to disk."""
+    file_path = Path(str(path))
+    if not (
+        file_path.name.startswith(_SPILL_PREFIX)
+        and file_path.suffix == ".json"
+        and file_path.parent.resolve() == _SPILL_DIR
+    ):
+        return {"success": False, "error": f"Refusing to read unexpected result file: {path}"}
+    try:
+        data = file_path.read_bytes()
+    except OSError as e:
+        return {"success": False, "error": f"Could not read large result file: {e}"}
+    finally:
+        try:
+            file_path.unlink()
+        except OSError:
+            pass
+    # ExtendScript may prepend a BOM when writing UTF-8.
+    try:
+        return _json_loads(data.decode("utf-8-sig"))
+    except ValueError as e:
+        return {"success": False, "error": f"Could not parse large result file: {e}"}
+
+
+def _json_loads(raw: str):
+    """Parse JSON with orjson when available, else the standard library."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN or integers beyond 64 bit: let json decide
+    return json.loads(raw)
+
+
+def _json_dumps(obj) -> str:
+    """Serialise obj to a JSON string (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+# RPC_E_DISCONNECTED       = -2147417848 (0x80010108)
+# RPC_S_SERVER_UNAVAILABLE = -2147023174 (0x800706BA)
+# CO_E_OBJNOTCONNECTED     = -2147220992 (0x80040004 — varies)
+# RPC_E_SERVERFAULT        = -2147417851 (0x80010105)
+_CONNECTION_LOSS_HRESULTS = frozenset((-2147417848, -2147023174, -2147220992, -2147417851))
+
+# Skeleton of every COM error dict (they arrive in bursts while InDesign
+# restarts); only "error" differs between copies.
+_COM_ERROR_TEMPLATE = {
+    "success": False,
+    "error": "",
+    "name": "COMError",
+    "line": -1,
+    "source": "COM/DoScript",
+}
+
+
 def _com_error_to_dict(e: pywintypes.com_error) -> dict:
     """Extract a human-readable error from a COM exception.
 
@@ -354,30 +960,23 @@ def _com_error_to_dict(e: pywintypes.com_error) -> dict:
     the next call will attempt a fresh reconnect.
     """
     global _app
-    desc = ""
-    hresult = e.args[0] if e.args else 0
+    args = e.args
+    hresult = args[0] if args else 0
+
+    # Detect connection-loss HRESULTs and invalidate the cached reference.
+    if hresult in _CONNECTION_LOSS_HRESULTS:
+        if log.isEnabledFor(logging.WARNING):
+            log.warning("Connection to InDesign lost (HRESULT %s). Will reconnect on next call.", hex(hresult & 0xFFFFFFFF))
+        _app = None
 
-    if hasattr(e, "args") and len(e.args) > 2:
-        excep = e.args[2]
+    desc = ""
+    if len(args) > 2:
+        excep = args[2]
         if excep and len(excep) > 2 and excep[2]:
             desc = str(excep[2])
     if not desc:
         desc = str(e)
 
-    # Detect connection-loss HRESULTs and invalidate the cached reference.
-    # RPC_E_DISCONNECTED       = -2147417848 (0x80010108)
-    # RPC_S_SERVER_UNAVAILABLE = -2147023174 (0x800706BA)
-    # CO_E_OBJNOTCONNECTED     = -2147220992 (0x80040004 — varies)
-    # RPC_E_SERVERFAULT        = -2147417851 (0x80010105)
-    connection_loss_codes = {-2147417848, -2147023174, -2147220992, -2147417851}
-    if hresult in connection_loss_codes:
-        log.warning("Connection to InDesign lost (HRESULT %s). Will reconnect on next call.", hex(hresult & 0xFFFFFFFF))
-        _app = None
-
-    return {
-        "success": False,
-        "error": desc,
-        "name": "COMError",
-        "line": -1,
-        "source": "COM/DoScript",
-    }
+    d = _COM_ERROR_TEMPLATE.copy()
+    d["error"] = desc
+    return d
@@ -21,8 +21,13 @@ import sys
 from datetime import date
 from pathlib import Path
 
-import parser as dom_parser
-import db as dom_db
+# parser and db are imported inside the commands that use them, so --help,
+# serve and review-submissions start without loading either.
+
+try:  # optional, faster serialisation of gotchas.json
+    import orjson
+except ImportError:
+    orjson = None
 
 BASE_DIR = Path(__file__).parent
 DEFAULT_DB = BASE_DIR / "extendscript.db"
@@ -30,40 +35,48 @@ LEGACY_DB = BASE_DIR / "indesign_dom.db"
 GOTCHAS_PATH = BASE_DIR / "gotchas.json"
 SUBMISSIONS_PATH = BASE_DIR / "submissions" / "pending.jsonl"
 
-
-def _default_db_path() -> Path:
-    """Return preferred db path."""
-    return DEFAULT_DB
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+# ASCII fast path of _SLUG_RE: every character outside [a-z0-9] becomes "-".
+_SLUG_TABLE = str.maketrans({
+    chr(c): "-" for c in range(128) if not ("a" <= chr(c) <= "z" or "0" <= chr(c) <= "9")
+})
 
 
 def cmd_analyze(args):
     """Analyze XML structure and print report."""
-    xml_path = args.xml
-    if not os.path.exists(xml_path):
-        print(f"Error: XML file not found: {xml_path}")
-        return 1
+    import parser as dom_parser
 
+    xml_path = args.xml
     source_key = args.source
     print(f"Parsing {xml_path} (source={source_key}) ...")
-    data = dom_parser.parse_xml(xml_path, source_key=source_key)
+    try:
+        data = dom_parser.parse_xml(xml_path, source_key=source_key)
+    except FileNotFoundError:
+        print(f"Error: XML file not found: {xml_path}")
+        return 1
     stats = dom_parser.analyze(data, xml_path)
     dom_parser.print_report(stats)
     return 0
 
 
 def cmd_build(args):
-    """Build database from XML."""
+    """Build database from XML.
+
+    The XML is parsed once; the same data feeds analyze, build and validate.
+    """
+    import parser as dom_parser
+
     xml_path = args.xml
-    db_path = args.db or str(_default_db_path())
+    db_path = args.db or str(DEFAULT_DB)
     source_key = args.source
 
-    if not os.path.exists(xml_path):
+    print(f"Parsing {xml_path} (source={source_key}) ...")
+    try:
+        data = dom_parser.parse_xml(xml_path, source_key=source_key)
+    except FileNotFoundError:
         print(f"Error: XML file not found: {xml_path}")
         return 1
 
-    print(f"Parsing {xml_path} (source={source_key}) ...")
-    data = dom_parser.parse_xml(xml_path, source_key=source_key)
-
     # Analysis report
     stats = dom_parser.analyze(data, xml_path)
     dom_parser.print_report(stats)
@@ -80,7 +93,7 @@ def cmd_build(args):
 
     # Validate
     print("\nValidating ...")
-    passed, messages = dom_parser.validate(data, db_path)
+    passed, messages = dom_parser.validate(data, db_path, expected_stats=build_stats)
     dom_parser.print_validation(passed, messages)
 
     if passed:
@@ -93,23 +106,25 @@ def cmd_build(args):
 
 def cmd_build_all(args):
     """Build database from DOM + JavaScript + ScriptUI XML sources."""
-    db_path = args.db or str(_default_db_path())
+    import parser as dom_parser
+
+    db_path = args.db or str(DEFAULT_DB)
     xml_sources = [
         ("dom", args.dom),
         ("javascript", args.js),
         ("scriptui", args.sui),
     ]
 
+    # Check every path first, so a typo in the last one doesn't cost a full
+    # parse of the others.
     for source_key, xml_path in xml_sources:
         if not os.path.exists(xml_path):
             print(f"Error: XML file not found for source '{source_key}': {xml_path}")
             return 1
 
-    parsed_sources = []
-    for source_key, xml_path in xml_sources:
-        print(f"Parsing {xml_path} (source={source_key}) ...")
-        data = dom_parser.parse_xml(xml_path, source_key=source_key)
-        parsed_sources.append(data)
+    print(f"Parsing {len(xml_sources)} sources ...")
+    parsed_sources = dom_parser.parse_sources(xml_sources, jobs=args.jobs)
+    for data, (_, xml_path) in zip(parsed_sources, xml_sources):
         stats = dom_parser.analyze(data, xml_path)
         dom_parser.print_report(stats)
 
@@ -124,24 +139,34 @@ def cmd_build_all(args):
     print(f"  Built at:   {build_stats['build_timestamp']}")
 
     print("\nValidating ...")
-    passed, messages = dom_parser.validate(parsed_sources, db_path, expect_sources=["dom", "javascript", "scriptui"])
+    passed, messages = dom_parser.validate(
+        parsed_sources,
+        db_path,
+        expect_sources=["dom", "javascript", "scriptui"],
+        expected_stats=build_stats,
+    )
     dom_parser.print_validation(passed, messages)
     return 0 if passed else 1
 
 
 def cmd_update(args):
-    """Update database from new XML (diff + rebuild)."""
+    """Update database from new XML (diff + rebuild).
+
+    The XML is parsed once; the same data feeds the diff, build and validate.
+    """
+    import parser as dom_parser
+
     xml_path = args.xml
-    db_path = args.db or str(_default_db_path())
+    db_path = args.db or str(DEFAULT_DB)
     source_key = args.source
 
-    if not os.path.exists(xml_path):
-        print(f"Error: XML file not found: {xml_path}")
-        return 1
-
     # Parse new XML
     print(f"Parsing {xml_path} (source={source_key}) ...")
-    new_data = dom_parser.parse_xml(xml_path, source_key=source_key)
+    try:
+        new_data = dom_parser.parse_xml(xml_path, source_key=source_key)
+    except FileNotFoundError:
+        print(f"Error: XML file not found: {xml_path}")
+        return 1
 
     # If DB exists, show diff
     if os.path.exists(db_path):
@@ -160,7 +185,7 @@ def cmd_update(args):
 
     # Validate
     print("\nValidating ...")
-    passed, messages = dom_parser.validate(new_data, db_path)
+    passed, messages = dom_parser.validate(new_data, db_path, expected_stats=build_stats)
     dom_parser.print_validation(passed, messages)
 
     if passed:
@@ -173,6 +198,8 @@ def cmd_update(args):
 
 def _print_diff(db_path: str, new_data: dict):
     """Print diff between existing DB and new XML data."""
+    import db as dom_db
+
     sep = "=" * 55
 
     try:
@@ -184,33 +211,48 @@ def _print_diff(db_path: str, new_data: dict):
     old_version = old_info.get("dom_version", "?")
     new_version = new_data["version"]
 
-    # Get old class names
+    # One pass over the new classes for the temp-table rows and the counts.
+    new_rows = []
+    new_prop_count = 0
+    new_meth_count = 0
+    for c in new_data["classes"]:
+        new_rows.append((c["name"], int(c["is_enum"])))
+        new_prop_count += len(c["properties"])
+        new_meth_count += len(c["methods"])
+
+    # Let SQLite compute the name deltas; only they come back to Python.
     try:
         conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        old_classes = {
-            r["name"]
-            for r in conn.execute("SELECT name FROM classes").fetchall()
-        }
-        old_enums = {
-            r["name"]
-            for r in conn.execute("SELECT name FROM classes WHERE is_enum = 1").fetchall()
-        }
-        old_counts = old_info.get("counts", {})
+        conn.execute("CREATE TEMP TABLE new_classes (name TEXT NOT NULL, is_enum INTEGER NOT NULL)")
+        conn.executemany(
+            "INSERT INTO temp.new_classes (name, is_enum) VALUES (?, ?)",
+            new_rows,
+        )
+        added_classes = [
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM temp.new_classes EXCEPT SELECT name FROM main.classes ORDER BY name"
+            )
+        ]
+        removed_classes = [
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM main.classes EXCEPT SELECT name FROM temp.new_classes ORDER BY name"
+            )
+        ]
+        (added_enum_count,) = conn.execute(
+            """SELECT COUNT(*) FROM (
+                   SELECT name FROM temp.new_classes WHERE is_enum
+                   EXCEPT SELECT name FROM main.classes WHERE is_enum = 1
+               )"""
+        ).fetchone()
+        (old_class_count,) = conn.execute("SELECT COUNT(DISTINCT name) FROM main.classes").fetchone()
         conn.close()
     except Exception:
         print("Could not read existing database for diff.")
         return
 
-    new_classes = {c["name"] for c in new_data["classes"]}
-    new_enums = {c["name"] for c in new_data["classes"] if c["is_enum"]}
-
-    added_classes = new_classes - old_classes
-    removed_classes = old_classes - new_classes
-    added_enums = new_enums - old_enums
-
-    new_prop_count = sum(len(c["properties"]) for c in new_data["classes"])
-    new_meth_count = sum(len(c["methods"]) for c in new_data["classes"])
+    old_counts = old_info.get("counts", {})
 
     old_prop_count = old_counts.get("properties", 0)
     old_meth_count = old_counts.get("methods", 0)
@@ -218,43 +260,54 @@ def _print_diff(db_path: str, new_data: dict):
     prop_diff = new_prop_count - old_prop_count
     meth_diff = new_meth_count - old_meth_count
 
-    print(sep)
-    print(f"  DOM Update: {old_version} -> {new_version}")
-    print(sep)
+    out = [sep, f"  DOM Update: {old_version} -> {new_version}", sep]
 
     if added_classes:
-        names = ", ".join(sorted(added_classes)[:10])
+        names = ", ".join(added_classes[:10])
         if len(added_classes) > 10:
             names += ", ..."
-        print(f"  New classes:      +{len(added_classes):>3}   ({names})")
+        out.append(f"  New classes:      +{len(added_classes):>3}   ({names})")
     else:
-        print(f"  New classes:      +  0")
+        out.append(f"  New classes:      +  0")
 
     if removed_classes:
-        names = ", ".join(sorted(removed_classes)[:10])
+        names = ", ".join(removed_classes[:10])
         if len(removed_classes) > 10:
             names += ", ..."
-        print(f"  Removed classes:  -{len(removed_classes):>3}   ({names})")
+        out.append(f"  Removed classes:  -{len(removed_classes):>3}   ({names})")
     else:
-        print(f"  Removed classes:  -  0")
+        out.append(f"  Removed classes:  -  0")
 
-    # Modified classes: classes present in both but potentially different
-    common = old_classes & new_classes
-    print(f"  Common classes:   {len(common):>5}")
+    # Modified classes: classes present in both but potentially different.
+    # Every old class is either removed or common, so no third set is needed.
+    common_count = old_class_count - len(removed_classes)
+    out.append(f"  Common classes:   {common_count:>5}")
 
-    if added_enums:
-        print(f"  New enums:        +{len(added_enums):>3}")
+    if added_enum_count:
+        out.append(f"  New enums:        +{added_enum_count:>3}")
 
     sign_p = "+" if prop_diff >= 0 else ""
     sign_m = "+" if meth_diff >= 0 else ""
-    print(f"  Properties delta: {sign_p}{prop_diff}")
-    print(f"  Methods delta:    {sign_m}{meth_diff}")
-    print(sep)
+    out.append(f"  Properties delta: {sign_p}{prop_diff}")
+    out.append(f"  Methods delta:    {sign_m}{meth_diff}")
+    out.append(sep)
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+_STRUCTURE_REPORT = """\
+  Version:    {info[dom_version]}
+  Title:      {info[dom_title]}
+  Source:     {info[source_file]}
+  Built:      {info[build_timestamp]}
+  Classes:    {counts[classes]}
+  Properties: {counts[properties]}
+  Methods:    {counts[methods]}
+"""
 
 
 def cmd_validate(args):
     """Validate database against XML."""
-    db_path = args.db or str(_default_db_path())
+    db_path = args.db or str(DEFAULT_DB)
     xml_path = args.xml
     expect_sources = args.expect_sources.split(",") if args.expect_sources else None
 
@@ -263,46 +316,55 @@ def cmd_validate(args):
         return 1
 
     if xml_path:
-        if not os.path.exists(xml_path):
-            print(f"Error: XML file not found: {xml_path}")
-            return 1
+        import parser as dom_parser
+
         source_key = args.source
         print(f"Parsing {xml_path} for validation (source={source_key}) ...")
-        data = dom_parser.parse_xml(xml_path, source_key=source_key)
+        try:
+            data = dom_parser.parse_xml(xml_path, source_key=source_key)
+        except FileNotFoundError:
+            print(f"Error: XML file not found: {xml_path}")
+            return 1
     else:
         print("Validating database structure (no XML comparison) ...")
-        conn = sqlite3.connect(db_path)
-        tables = [
-            r[0]
-            for r in conn.execute(
-                "SELECT name FROM sqlite_master WHERE type='table'"
-            ).fetchall()
-        ]
-        conn.close()
-
-        expected = {"db_meta", "sources", "suites", "classes", "properties", "methods", "parameters", "dom_search"}
-        missing = expected - set(tables)
-        if missing:
-            print(f"FAIL: Missing tables: {missing}")
-            return 1
+        import db as dom_db
 
-        if expect_sources:
-            conn = sqlite3.connect(db_path)
-            found_sources = {r[0] for r in conn.execute("SELECT key FROM sources").fetchall()}
-            conn.close()
-            missing_sources = set(expect_sources) - found_sources
-            if missing_sources:
-                print(f"FAIL: Missing sources: {sorted(missing_sources)}")
+        # One read-only connection serves the table, source and info queries.
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            expected = [
+                "db_meta", "sources", "suites", "classes", "properties", "methods", "parameters",
+                "dom_search", "search_refs",
+            ]
+            missing = {
+                r[0]
+                for r in conn.execute(
+                    "SELECT value FROM json_each(?) EXCEPT SELECT name FROM sqlite_master WHERE type='table'",
+                    (json.dumps(expected),),
+                )
+            }
+            if missing:
+                print(f"FAIL: Missing tables: {missing}")
+                if "search_refs" in missing:
+                    print("  Databases built before parser 2.1.0 lack search_refs: rebuild with build-all.")
                 return 1
 
-        info = dom_db.dom_info(db_path=db_path)
-        print(f"  Version:    {info['dom_version']}")
-        print(f"  Title:      {info['dom_title']}")
-        print(f"  Source:     {info['source_file']}")
-        print(f"  Built:      {info['build_timestamp']}")
-        print(f"  Classes:    {info['counts']['classes']}")
-        print(f"  Properties: {info['counts']['properties']}")
-        print(f"  Methods:    {info['counts']['methods']}")
+            if expect_sources:
+                missing_sources = {
+                    r[0]
+                    for r in conn.execute(
+                        "SELECT value FROM json_each(?) EXCEPT SELECT key FROM sources",
+                        (json.dumps(expect_sources),),
+                    )
+                }
+                if missing_sources:
+                    print(f"FAIL: Missing sources: {sorted(missing_sources)}")
+                    return 1
+
+            info = dom_db.dom_info(conn=conn)
+        finally:
+            conn.close()
+        sys.stdout.write(_STRUCTURE_REPORT.format(info=info, counts=info["counts"]))
 
         _run_regression_checks(db_path)
         print("  Structure validation: [OK] PASSED")
@@ -316,7 +378,7 @@ def cmd_validate(args):
 
 def cmd_serve(args):
     """Start the MCP server."""
-    db_path = args.db or str(_default_db_path())
+    db_path = args.db or str(DEFAULT_DB)
 
     if not os.path.exists(db_path):
         print(f"Error: Database not found: {db_path}")
@@ -335,41 +397,48 @@ def cmd_serve(args):
     return 0
 
 
+_INFO_REPORT = """\
+{sep}
+  InDesign DOM Database Info
+{sep}
+  Version:        {info[dom_version]}
+  Title:          {info[dom_title]}
+  Source file:    {info[source_file]}
+  Source files:   {info[source_files]}
+  Built:          {info[build_timestamp]}
+  Parser version: {info[parser_version]}
+{sep}
+  Suites:           {counts[suites]:>6}
+  Classes (total):  {counts[classes]:>6}
+    Regular:        {counts[regular_classes]:>6}
+    Enumerations:   {counts[enums]:>6}
+  Properties:       {counts[properties]:>6}
+  Methods:          {counts[methods]:>6}
+  Parameters:       {counts[parameters]:>6}
+{sep}
+"""
+
+
 def cmd_info(args):
     """Show database statistics."""
-    db_path = args.db or str(_default_db_path())
+    db_path = args.db or str(DEFAULT_DB)
 
     if not os.path.exists(db_path):
         print(f"Error: Database not found: {db_path}")
         return 1
 
+    import db as dom_db
+
     info = dom_db.dom_info(db_path=db_path)
 
-    sep = "=" * 55
-    print(sep)
-    print(f"  InDesign DOM Database Info")
-    print(sep)
-    print(f"  Version:        {info['dom_version']}")
-    print(f"  Title:          {info['dom_title']}")
-    print(f"  Source file:    {info['source_file']}")
-    print(f"  Source files:   {info['source_files']}")
-    print(f"  Built:          {info['build_timestamp']}")
-    print(f"  Parser version: {info['parser_version']}")
-    print(sep)
-    counts = info["counts"]
-    print(f"  Suites:           {counts['suites']:>6}")
-    print(f"  Classes (total):  {counts['classes']:>6}")
-    print(f"    Regular:        {counts['regular_classes']:>6}")
-    print(f"    Enumerations:   {counts['enums']:>6}")
-    print(f"  Properties:       {counts['properties']:>6}")
-    print(f"  Methods:          {counts['methods']:>6}")
-    print(f"  Parameters:       {counts['parameters']:>6}")
-    print(sep)
+    sys.stdout.write(_INFO_REPORT.format(sep="=" * 55, info=info, counts=info["counts"]))
     return 0
 
 
 def _run_regression_checks(db_path: str):
     """Run sample queries for quick regression coverage."""
+    import db as dom_db
+
     checks = [
         ("UnitValue", "javascript"),
         ("$", "javascript"),
@@ -377,31 +446,40 @@ def _run_regression_checks(db_path: str):
         ("RegExp", "javascript"),
         ("ScriptUI", "scriptui"),
     ]
-    print("  Regression checks:")
+    found = dom_db.lookup_classes_bulk([name for name, _ in checks] + ["Window"], db_path=db_path)
+    out = ["  Regression checks:"]
     for class_name, source in checks:
-        row = dom_db.lookup_class(class_name, source=source, db_path=db_path)
-        status = "OK" if row else "FAIL"
-        print(f"    {status}: lookup_class('{class_name}', source='{source}')")
-    collision = dom_db.lookup_class("Window", db_path=db_path)
-    if isinstance(collision, list) and len(collision) >= 2:
-        print("    OK: lookup_class('Window') resolves multiple sources")
+        status = "OK" if source in found.get(class_name, ()) else "FAIL"
+        out.append(f"    {status}: lookup_class('{class_name}', source='{source}')")
+    if len(found.get("Window", ())) >= 2:
+        out.append("    OK: lookup_class('Window') resolves multiple sources")
     else:
-        print("    FAIL: lookup_class('Window') should return multiple sources")
+        out.append("    FAIL: lookup_class('Window') should return multiple sources")
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def _slugify(text: str) -> str:
     """Build a stable slug for gotcha IDs."""
-    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    lowered = text.lower()
+    if lowered.isascii():
+        slug = "-".join(filter(None, lowered.translate(_SLUG_TABLE).split("-")))
+    else:
+        slug = _SLUG_RE.sub("-", lowered).strip("-")
     return slug or "learning"
 
 
-def _next_unique_id(base: str, existing: set[str]) -> str:
-    """Return unique ID by suffixing with numbers when needed."""
+def _next_unique_id(base: str, existing: set[str], counters: dict[str, int]) -> str:
+    """Return unique ID by suffixing with numbers when needed.
+
+    ``counters`` remembers the next suffix to try per base, so repeated
+    bases within one session don't rescan the suffixes already taken.
+    """
     if base not in existing:
         return base
-    idx = 2
+    idx = counters.get(base, 2)
     while f"{base}-{idx}" in existing:
         idx += 1
+    counters[base] = idx + 1
     return f"{base}-{idx}"
 
 
@@ -420,18 +498,32 @@ def _load_gotchas_file() -> dict:
     return data
 
 
-def _safe_write_text(path: Path, content: str):
-    """Write text robustly on Windows sync folders."""
+def _safe_write_bytes(path: Path, content: bytes):
+    """Write bytes robustly on Windows sync folders."""
     path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        path.write_text(content, encoding="utf-8")
+        path.write_bytes(content)
         return
     except OSError:
-        # Fallback path for environments where Path.write_text intermittently fails.
-        with open(path, "w", encoding="utf-8", newline="") as f:
+        # Fallback path for environments where Path.write_bytes intermittently fails.
+        with open(path, "wb") as f:
             f.write(content)
 
 
+def _dump_gotchas(gotchas: dict) -> bytes:
+    """Serialise gotchas as indented UTF-8 JSON with a trailing newline.
+
+    Uses orjson when available; the output matches
+    ``json.dumps(indent=2, ensure_ascii=False)``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(gotchas, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bit: let json decide
+    return (json.dumps(gotchas, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
 def _print_submission(idx: int, item: dict):
     """Print pending learning submission."""
     print("-" * 72)
@@ -448,90 +540,237 @@ def _print_submission(idx: int, item: dict):
         print(f"  JSX:      {preview[:180]}")
 
 
+def _rewrite_queue(kept_lines: list[str], consumed: int):
+    """Replace the reviewed part of the pending queue with ``kept_lines``.
+
+    The queue is append-only for the exec server, so anything appended
+    after byte offset ``consumed`` (while the review was running) is carried
+    over unread.  The new file is swapped in atomically.
+    """
+    with SUBMISSIONS_PATH.open("rb") as f:
+        f.seek(consumed)
+        appended = f.read()
+    content = "".join(line + "\n" for line in kept_lines).encode("utf-8") + appended
+    tmp_path = SUBMISSIONS_PATH.with_name(SUBMISSIONS_PATH.name + ".tmp")
+    _safe_write_bytes(tmp_path, content)
+    os.replace(tmp_path, SUBMISSIONS_PATH)
+
+
+def _approved_entry(item: dict, existing_ids: set[str], id_counters: dict[str, int]) -> dict | None:
+    """Build the gotcha entry for an approved submission.
+
+    Returns None if required fields are missing.  The new ID is added to
+    ``existing_ids``.
+    """
+    problem = str(item.get("problem", "")).strip()
+    solution = str(item.get("solution", "")).strip()
+    triggers = item.get("triggers", [])
+    if not problem or not solution or not isinstance(triggers, list) or not triggers:
+        return None
+
+    base_id = _slugify(problem)[:64]
+    entry_id = _next_unique_id(base_id, existing_ids, id_counters)
+    existing_ids.add(entry_id)
+    approved_entry = {
+        "id": entry_id,
+        "category": str(item.get("category", "extendscript")),
+        "severity": str(item.get("severity", "warning")),
+        "triggers": [str(t).strip() for t in triggers if str(t).strip()],
+        "problem": problem,
+        "solution": solution,
+        "added": date.today().isoformat(),
+        "source": "auto-submission",
+    }
+    if item.get("jsx_context"):
+        approved_entry["example_bad"] = str(item["jsx_context"])
+    return approved_entry
+
+
+def _submission_key(item: dict) -> str:
+    """Stable identity of a submission for matching decisions to the queue."""
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+def _write_decisions(decisions_path: Path) -> int:
+    """Export pending submissions as an editable decisions file."""
+    count = 0
+    with SUBMISSIONS_PATH.open("rb") as src, decisions_path.open("w", encoding="utf-8", newline="\n") as out:
+        for ln in src:
+            try:
+                item = json.loads(ln)
+            except ValueError:
+                continue  # blank or invalid lines stay in the queue untouched
+            if not isinstance(item, dict):
+                continue
+            out.write(json.dumps({"action": "s", "submission": item}, ensure_ascii=False) + "\n")
+            count += 1
+    if not count:
+        decisions_path.unlink()
+        print("No pending submissions.")
+        return 0
+    print(f"Wrote {count} submission(s) to {decisions_path}")
+    print('Set "action" to "a" (approve), "r" (reject) or "s" (skip) on each line,')
+    print("then run the same command again to apply the decisions.")
+    return 0
+
+
+def _apply_decisions(decisions_path: Path) -> int:
+    """Apply an edited decisions file to the pending queue in one pass."""
+    actions: dict[str, list[str]] = {}
+    with decisions_path.open("rb") as f:
+        for lineno, ln in enumerate(f, start=1):
+            if not ln.strip():
+                continue
+            try:
+                decision = json.loads(ln)
+                key = _submission_key(decision["submission"])
+                action = str(decision.get("action", "s")).strip().lower() or "s"
+            except (ValueError, KeyError, TypeError, AttributeError):
+                print(f"Error: invalid decision on line {lineno} of {decisions_path}; nothing applied.")
+                return 1
+            actions.setdefault(key, []).append(action)
+
+    gotchas = _load_gotchas_file()
+    entries = gotchas.get("entries", [])
+    existing_ids = {str(e.get("id", "")).strip() for e in entries if isinstance(e, dict)}
+    id_counters: dict[str, int] = {}
+
+    approved = 0
+    rejected = 0
+    kept_lines: list[str] = []
+    with SUBMISSIONS_PATH.open("rb") as f:
+        for ln in f:
+            ln = ln.rstrip(b"\r\n")
+            if not ln.strip():
+                continue
+            raw = ln.decode("utf-8")
+            try:
+                item = json.loads(ln)
+            except ValueError:
+                item = None
+            pending = actions.get(_submission_key(item)) if isinstance(item, dict) else None
+            action = pending.pop(0) if pending else "s"
+            if action == "r":
+                rejected += 1
+                continue
+            if action == "a":
+                approved_entry = _approved_entry(item, existing_ids, id_counters)
+                if approved_entry is not None:
+                    entries.append(approved_entry)
+                    approved += 1
+                    continue
+                print(f"Cannot approve (missing problem/solution/triggers), keeping pending: {raw[:120]}")
+            kept_lines.append(raw)
+        consumed = f.tell()
+
+    # Decisions left over matched no queued submission: the submission was
+    # edited in the file or the queue changed since the export.
+    unmatched = sum(action in ("a", "r") for pending in actions.values() for action in pending)
+    if unmatched:
+        print(
+            f"Error: {unmatched} approve/reject decision(s) in {decisions_path} match no pending "
+            "submission (edited submission or changed queue); nothing applied."
+        )
+        return 1
+
+    if approved:
+        gotchas["entries"] = entries
+        _safe_write_bytes(GOTCHAS_PATH, _dump_gotchas(gotchas))
+    if approved or rejected:
+        _rewrite_queue(kept_lines, consumed)
+    decisions_path.unlink()
+
+    print(f"Decisions applied. Approved: {approved}, Rejected: {rejected}, Still pending: {len(kept_lines)}")
+    print(f"Updated gotchas file: {GOTCHAS_PATH}")
+    print(f"Pending queue file:   {SUBMISSIONS_PATH}")
+    return 0
+
+
 def cmd_review_submissions(args):
-    """Review pending learning submissions and promote approved ones."""
+    """Review pending learning submissions and promote approved ones.
+
+    With ``--decisions PATH`` the review is done in a file instead of
+    prompting: the first run exports every pending submission to PATH with
+    ``"action": "s"``; after editing, the second run applies all decisions
+    in one pass and removes PATH.
+    """
     if not SUBMISSIONS_PATH.exists():
         print(f"No submission file found: {SUBMISSIONS_PATH}")
         return 0
 
-    raw_lines = SUBMISSIONS_PATH.read_text(encoding="utf-8").splitlines()
-    lines = [ln for ln in raw_lines if ln.strip()]
-    if not lines:
-        print("No pending submissions.")
-        return 0
+    if args.decisions:
+        decisions_path = Path(args.decisions)
+        if decisions_path.exists():
+            return _apply_decisions(decisions_path)
+        return _write_decisions(decisions_path)
 
     gotchas = _load_gotchas_file()
     entries = gotchas.get("entries", [])
     existing_ids = {str(e.get("id", "")).strip() for e in entries if isinstance(e, dict)}
+    id_counters: dict[str, int] = {}
 
     approved = 0
     rejected = 0
+    idx = 0
     kept_lines: list[str] = []
     pending_tail: list[str] = []
     quit_early = False
 
-    parsed_items: list[tuple[str, dict | None]] = []
-    for ln in lines:
-        try:
-            parsed_items.append((ln, json.loads(ln)))
-        except Exception:
-            parsed_items.append((ln, None))
-
-    for idx, (raw, item) in enumerate(parsed_items, start=1):
-        if quit_early:
-            pending_tail.append(raw)
-            continue
-        if item is None or not isinstance(item, dict):
-            print(f"Skipping invalid JSON line #{idx}; keeping it in pending queue.")
-            kept_lines.append(raw)
-            continue
-
-        _print_submission(idx, item)
-        choice = input("Action [a=approve, s=skip, r=reject, q=quit] (default: s): ").strip().lower() or "s"
-        if choice == "q":
-            quit_early = True
-            pending_tail = [raw]
-            continue
-        if choice == "r":
-            rejected += 1
-            continue
-        if choice != "a":
-            kept_lines.append(raw)
-            continue
-
-        problem = str(item.get("problem", "")).strip()
-        solution = str(item.get("solution", "")).strip()
-        triggers = item.get("triggers", [])
-        if not problem or not solution or not isinstance(triggers, list) or not triggers:
-            print("  Cannot approve: missing required fields (problem/solution/triggers). Keeping pending.")
-            kept_lines.append(raw)
-            continue
-
-        base_id = _slugify(problem)[:64]
-        entry_id = _next_unique_id(base_id, existing_ids)
-        existing_ids.add(entry_id)
-        approved_entry = {
-            "id": entry_id,
-            "category": str(item.get("category", "extendscript")),
-            "severity": str(item.get("severity", "warning")),
-            "triggers": [str(t).strip() for t in triggers if str(t).strip()],
-            "problem": problem,
-            "solution": solution,
-            "added": date.today().isoformat(),
-            "source": "auto-submission",
-        }
-        if item.get("jsx_context"):
-            approved_entry["example_bad"] = str(item["jsx_context"])
-
-        entries.append(approved_entry)
-        approved += 1
+    # Stream the queue one line at a time.  Lines stay bytes for
+    # json.loads() and are only decoded to be written back.
+    with SUBMISSIONS_PATH.open("rb") as f:
+        for ln in f:
+            ln = ln.rstrip(b"\r\n")
+            if not ln.strip():
+                continue
+            idx += 1
+            raw = ln.decode("utf-8")
+            if quit_early:
+                pending_tail.append(raw)
+                continue
+            try:
+                item = json.loads(ln)
+            except Exception:
+                item = None
+            if item is None or not isinstance(item, dict):
+                print(f"Skipping invalid JSON line #{idx}; keeping it in pending queue.")
+                kept_lines.append(raw)
+                continue
+
+            _print_submission(idx, item)
+            choice = input("Action [a=approve, s=skip, r=reject, q=quit] (default: s): ").strip().lower() or "s"
+            if choice == "q":
+                quit_early = True
+                pending_tail = [raw]
+                continue
+            if choice == "r":
+                rejected += 1
+                continue
+            if choice != "a":
+                kept_lines.append(raw)
+                continue
+
+            approved_entry = _approved_entry(item, existing_ids, id_counters)
+            if approved_entry is None:
+                print("  Cannot approve: missing required fields (problem/solution/triggers). Keeping pending.")
+                kept_lines.append(raw)
+                continue
+            entries.append(approved_entry)
+            approved += 1
+        consumed = f.tell()
+
+    if not idx:
+        print("No pending submissions.")
+        return 0
 
     if pending_tail:
         kept_lines.extend(pending_tail)
 
-    gotchas["entries"] = entries
-    _safe_write_text(GOTCHAS_PATH, json.dumps(gotchas, indent=2, ensure_ascii=False) + "\n")
-    _safe_write_text(SUBMISSIONS_PATH, ("\n".join(kept_lines) + "\n") if kept_lines else "")
+    if approved:
+        gotchas["entries"] = entries
+        _safe_write_bytes(GOTCHAS_PATH, _dump_gotchas(gotchas))
+    if approved or rejected:
+        _rewrite_queue(kept_lines, consumed)
 
     print("-" * 72)
     print(f"Review complete. Approved: {approved}, Rejected: {rejected}, Still pending: {len(kept_lines)}")
@@ -578,14 +817,20 @@ Commands:
         choices=["dom", "javascript", "scriptui"],
         help="Source key for this XML file",
     )
-    p_build.add_argument("--db", help=f"Database path (default: {_default_db_path()})")
+    p_build.add_argument("--db", help=f"Database path (default: {DEFAULT_DB})")
 
     # build-all
     p_build_all = subparsers.add_parser("build-all", help="Build database from DOM+JavaScript+ScriptUI XML")
     p_build_all.add_argument("--dom", required=True, help="Path to InDesign DOM OMV XML")
     p_build_all.add_argument("--js", required=True, help="Path to javascript.xml")
     p_build_all.add_argument("--sui", required=True, help="Path to scriptui.xml")
-    p_build_all.add_argument("--db", help=f"Database path (default: {_default_db_path()})")
+    p_build_all.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Parse the XML sources in this many processes (default: 1)",
+    )
+    p_build_all.add_argument("--db", help=f"Database path (default: {DEFAULT_DB})")
 
     # update
     p_update = subparsers.add_parser("update", help="Update database from new XML")
@@ -596,7 +841,7 @@ Commands:
         choices=["dom", "javascript", "scriptui"],
         help="Source key for this XML file",
     )
-    p_update.add_argument("--db", help=f"Database path (default: {_default_db_path()})")
+    p_update.add_argument("--db", help=f"Database path (default: {DEFAULT_DB})")
 
     # validate
     p_validate = subparsers.add_parser("validate", help="Validate database")
@@ -608,21 +853,25 @@ Commands:
         help="Source key for XML validation mode",
     )
     p_validate.add_argument("--expect-sources", help="Comma-separated expected sources (e.g. dom,javascript,scriptui)")
-    p_validate.add_argument("--db", help=f"Database path (default: {_default_db_path()})")
+    p_validate.add_argument("--db", help=f"Database path (default: {DEFAULT_DB})")
 
     # serve
     p_serve = subparsers.add_parser("serve", help="Start MCP server")
-    p_serve.add_argument("--db", help=f"Database path (default: {_default_db_path()})")
+    p_serve.add_argument("--db", help=f"Database path (default: {DEFAULT_DB})")
 
     # info
     p_info = subparsers.add_parser("info", help="Show database statistics")
-    p_info.add_argument("--db", help=f"Database path (default: {_default_db_path()})")
+    p_info.add_argument("--db", help=f"Database path (default: {DEFAULT_DB})")
 
     # review-submissions
-    subparsers.add_parser(
+    p_review = subparsers.add_parser(
         "review-submissions",
         help="Review local learning submissions and promote approved ones",
     )
+    p_review.add_argument(
+        "--decisions",
+        help="Review via an editable file: export to PATH if missing, otherwise apply it",
+    )
 
     args = parser.parse_args()
 
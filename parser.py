@@ -2,14 +2,61 @@
 InDesign DOM Parser - Parses OMV XML sources into SQLite database.
 """
 
-import json
+import functools
+import heapq
 import os
-import re
 import sqlite3
-import xml.etree.ElementTree as ET
+import sys
 from datetime import datetime
+from typing import NamedTuple
 
-PARSER_VERSION = "2.0.0"
+try:  # optional: libxml2-backed parsing, same ElementTree API
+    from lxml import etree as ET
+
+    _ITERPARSE_OPTIONS = {"huge_tree": True}
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    _ITERPARSE_OPTIONS = {}
+
+PARSER_VERSION = "2.1.0"
+
+
+# Members are parsed into lightweight tuples (there are tens of thousands of
+# them). Properties and parameters list their fields in table column order.
+
+class Property(NamedTuple):
+    name: str
+    description: str
+    data_type: str | None
+    data_type_ref: str | None
+    is_array: bool
+    is_readonly: bool
+    element_type: str
+    default_value: str | None
+    min_value: str | None
+    max_value: str | None
+
+
+class Parameter(NamedTuple):
+    name: str
+    description: str
+    data_type: str | None
+    data_type_ref: str | None
+    is_array: bool
+    is_optional: bool
+    default_value: str | None
+    sort_order: int
+
+
+class Method(NamedTuple):
+    name: str
+    description: str
+    return_type: str | None
+    return_type_ref: str | None
+    return_is_array: bool
+    element_type: str
+    parameters: list[Parameter]
 
 
 # ---------------------------------------------------------------------------
@@ -17,12 +64,44 @@ PARSER_VERSION = "2.0.0"
 # ---------------------------------------------------------------------------
 
 def parse_xml(xml_path: str, source_key: str = "dom") -> dict:
-    """Parse one OMV XML file and return structured data."""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    _strip_namespace(root)
+    """Parse one OMV XML file and return structured data.
+
+    The file is parsed incrementally: each ``package/classdef`` is converted
+    as soon as it is complete and then dropped from the tree, so peak memory
+    no longer holds the whole document.
+    """
+    source_key = sys.intern(source_key)
+    map_el = None
+    package_el = None
+    packages_done = 0
+    classes = []
+    path = []  # local names of the currently open elements
+
+    for event, elem in ET.iterparse(xml_path, events=("start", "end"), **_ITERPARSE_OPTIONS):
+        if event == "start":
+            tag = elem.tag
+            path.append(tag.rpartition("}")[2])
+            if len(path) == 2 and path[1] == "package" and packages_done == 0:
+                package_el = elem
+            continue
+
+        tag = path.pop()
+        depth = len(path)
+        if depth == 2 and package_el is not None and path[1] == "package":
+            # Direct child of the first <package>: parse and release it.
+            if tag == "classdef":
+                _strip_namespace(elem)
+                classes.append(_parse_classdef(elem, source_key=source_key))
+            elem.clear()
+            package_el.remove(elem)
+        elif depth == 1:
+            if tag == "map" and map_el is None:
+                _strip_namespace(elem)
+                map_el = elem
+            elif tag == "package":
+                packages_done += 1
+                package_el = None
 
-    map_el = root.find("map")
     if map_el is None:
         raise ValueError("No <map> element found in XML")
 
@@ -37,15 +116,11 @@ def parse_xml(xml_path: str, source_key: str = "dom") -> dict:
         for cn in class_names:
             class_to_suite[cn] = suite_name
 
-    package = root.find("package")
-    if package is None:
+    if not packages_done:
         raise ValueError("No <package> element found in XML")
 
-    classes = []
-    for classdef in package.findall("./classdef"):
-        cls = _parse_classdef(classdef, source_key=source_key)
+    for cls in classes:
         cls["suite"] = class_to_suite.get(cls["name"], "")
-        classes.append(cls)
 
     return {
         "source_key": source_key,
@@ -58,11 +133,23 @@ def parse_xml(xml_path: str, source_key: str = "dom") -> dict:
     }
 
 
-def parse_sources(sources: list[tuple[str, str]]) -> list[dict]:
+def parse_sources(sources: list[tuple[str, str]], jobs: int = 1) -> list[dict]:
     """Parse multiple XML sources.
 
     sources: [(source_key, xml_path), ...]
+    jobs: worker processes; with more than one, the sources are parsed in
+    parallel.  Results are always returned in the order of ``sources``.
     """
+    if jobs > 1 and len(sources) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(sources))) as executor:
+            return list(executor.map(
+                parse_xml,
+                [xml_path for _, xml_path in sources],
+                [source_key for source_key, _ in sources],
+            ))
+
     parsed = []
     for source_key, xml_path in sources:
         parsed.append(parse_xml(xml_path, source_key=source_key))
@@ -72,17 +159,22 @@ def parse_sources(sources: list[tuple[str, str]]) -> list[dict]:
 def _strip_namespace(root: ET.Element) -> None:
     """Normalize namespaced XML tags to local names in-place."""
     for elem in root.iter():
-        if "}" in elem.tag:
-            elem.tag = elem.tag.split("}", 1)[1]
+        tag = elem.tag
+        # lxml keeps comments in the tree; their tag is not a string.
+        if isinstance(tag, str):
+            # rpartition hands back ``tag`` itself when there is no namespace.
+            local = tag.rpartition("}")[2]
+            if local is not tag:
+                elem.tag = local
 
 
 def _parse_suites(map_el) -> dict:
     """Parse suite navigation from map/topicref nodes."""
     suites = {}
-    for suite_ref in map_el.findall("./topicref"):
+    for suite_ref in map_el.findall("topicref"):
         suite_name = suite_ref.get("navtitle", "")
         class_names = []
-        for class_ref in suite_ref.findall("./topicref"):
+        for class_ref in suite_ref.findall("topicref"):
             href = class_ref.get("href", "")
             if href.startswith("#/"):
                 class_names.append(href[2:])
@@ -107,13 +199,13 @@ def _parse_classdef(classdef, source_key: str) -> dict:
     properties = []
     methods = []
 
-    for elements in classdef.findall("./elements"):
-        element_type = elements.get("type", "instance")
+    for elements in classdef.findall("elements"):
+        element_type = sys.intern(elements.get("type", "instance"))
 
-        for prop in elements.findall("./property"):
+        for prop in elements.findall("property"):
             properties.append(_parse_property(prop, element_type))
 
-        for meth in elements.findall("./method"):
+        for meth in elements.findall("method"):
             methods.append(_parse_method(meth, element_type))
 
     return {
@@ -129,9 +221,9 @@ def _parse_classdef(classdef, source_key: str) -> dict:
     }
 
 
-def _parse_property(prop, element_type: str) -> dict:
+def _parse_property(prop, element_type: str) -> Property:
     """Parse one property."""
-    name = prop.get("name", "")
+    name = sys.intern(prop.get("name", ""))
     rwaccess = prop.get("rwaccess", "")
     is_readonly = rwaccess == "readonly"
 
@@ -140,23 +232,23 @@ def _parse_property(prop, element_type: str) -> dict:
     description = _merge_descriptions(short_description, long_description)
     data_type, data_type_ref, is_array, default_value, min_value, max_value = _parse_datatypes(prop)
 
-    return {
-        "name": name,
-        "description": description,
-        "data_type": data_type,
-        "data_type_ref": data_type_ref,
-        "is_array": is_array,
-        "is_readonly": is_readonly,
-        "element_type": element_type,
-        "default_value": default_value,
-        "min_value": min_value,
-        "max_value": max_value,
-    }
+    return Property(
+        name,
+        description,
+        data_type,
+        data_type_ref,
+        is_array,
+        is_readonly,
+        element_type,
+        default_value,
+        min_value,
+        max_value,
+    )
 
 
-def _parse_method(meth, element_type: str) -> dict:
+def _parse_method(meth, element_type: str) -> Method:
     """Parse one method."""
-    name = meth.get("name", "")
+    name = sys.intern(meth.get("name", ""))
 
     short_description = _extract_text(meth.find("shortdesc"))
     long_description = _extract_text(meth.find("description"))
@@ -167,23 +259,23 @@ def _parse_method(meth, element_type: str) -> dict:
     parameters = []
     params_el = meth.find("parameters")
     if params_el is not None:
-        for idx, param in enumerate(params_el.findall("./parameter")):
+        for idx, param in enumerate(params_el.findall("parameter")):
             parameters.append(_parse_parameter(param, idx))
 
-    return {
-        "name": name,
-        "description": description,
-        "return_type": return_type,
-        "return_type_ref": return_type_ref,
-        "return_is_array": return_is_array,
-        "element_type": element_type,
-        "parameters": parameters,
-    }
+    return Method(
+        name,
+        description,
+        return_type,
+        return_type_ref,
+        return_is_array,
+        element_type,
+        parameters,
+    )
 
 
-def _parse_parameter(param, sort_order: int) -> dict:
+def _parse_parameter(param, sort_order: int) -> Parameter:
     """Parse one method parameter."""
-    name = param.get("name", "")
+    name = sys.intern(param.get("name", ""))
     is_optional = param.get("optional") == "true"
 
     short_description = _extract_text(param.find("shortdesc"))
@@ -195,21 +287,21 @@ def _parse_parameter(param, sort_order: int) -> dict:
 
     data_type, data_type_ref, is_array, default_value, _, _ = _parse_datatypes(param)
 
-    return {
-        "name": name,
-        "description": description,
-        "data_type": data_type,
-        "data_type_ref": data_type_ref,
-        "is_array": is_array,
-        "is_optional": is_optional,
-        "default_value": default_value,
-        "sort_order": sort_order,
-    }
+    return Parameter(
+        name,
+        description,
+        data_type,
+        data_type_ref,
+        is_array,
+        is_optional,
+        default_value,
+        sort_order,
+    )
 
 
 def _parse_datatypes(parent):
     """Parse one or multiple datatype child nodes from a parent node."""
-    datatypes = parent.findall("./datatype")
+    datatypes = parent.findall("datatype")
     if not datatypes:
         return None, None, False, None, None, None
 
@@ -220,8 +312,14 @@ def _parse_datatypes(parent):
     min_value = None
     max_value = None
 
+    extract = _extract_text
     for datatype in datatypes:
-        type_el = datatype.find("type")
+        # First child per tag in one pass, instead of a find() per tag.
+        children = {}
+        for child in datatype:
+            children.setdefault(child.tag, child)
+        type_el = children.get("type")
+        is_array = "array" in children
         type_str = None
         type_href = None
 
@@ -231,39 +329,50 @@ def _parse_datatypes(parent):
             if varies:
                 type_str = f"varies={varies}"
             else:
-                type_str = _extract_text(type_el)
+                type_str = extract(type_el)
         if type_str:
-            if datatype.find("array") is not None:
+            if is_array:
                 type_str = f"{type_str}[]"
             type_parts.append(type_str)
         if type_href:
-            ref_parts.append(_normalize_type_href(type_href))
+            ref_parts.append(sys.intern(_normalize_type_href(type_href)))
 
-        is_array_any = is_array_any or (datatype.find("array") is not None)
+        is_array_any = is_array_any or is_array
 
         if default_value is None:
-            default_value = _extract_text(datatype.find("value")) or None
+            default_value = extract(children.get("value")) or None
         if min_value is None:
-            min_value = _extract_text(datatype.find("min")) or None
+            min_value = extract(children.get("min")) or None
         if max_value is None:
-            max_value = _extract_text(datatype.find("max")) or None
+            max_value = extract(children.get("max")) or None
 
-    unique_types = list(dict.fromkeys(type_parts))
-    unique_refs = list(dict.fromkeys(ref_parts))
-    data_type = "|".join(unique_types) if unique_types else None
-    data_type_ref = "|".join(unique_refs) if unique_refs else None
+    data_type = _join_unique(type_parts)
+    data_type_ref = _join_unique(ref_parts)
     return data_type, data_type_ref, is_array_any, default_value, min_value, max_value
 
 
+def _join_unique(parts: list[str]) -> str | None:
+    """Pipe-join distinct parts in first-seen order; None when empty."""
+    # Nearly every member has exactly one datatype.
+    if len(parts) == 1:
+        return parts[0]
+    return "|".join(dict.fromkeys(parts)) if parts else None
+
+
+# href prefix -> normalized prefix, tried in order
+_HREF_PREFIXES = (
+    ("$COMMON/javascript.xml#/", "javascript:"),
+    ("$COMMON/scriptui.xml#/", "scriptui:"),
+    ("#/", "local:"),
+)
+
+
 def _normalize_type_href(href: str) -> str:
     """Normalize href values for storage and lookup."""
     href = href.strip()
-    if href.startswith("$COMMON/javascript.xml#/"):
-        return f"javascript:{href.split('#/', 1)[1]}"
-    if href.startswith("$COMMON/scriptui.xml#/"):
-        return f"scriptui:{href.split('#/', 1)[1]}"
-    if href.startswith("#/"):
-        return f"local:{href[2:]}"
+    for prefix, normalized in _HREF_PREFIXES:
+        if href.startswith(prefix):
+            return normalized + href[len(prefix):]
     return href
 
 
@@ -271,13 +380,18 @@ def _extract_text(elem) -> str:
     """Extract normalized plain text from an XML element."""
     if elem is None:
         return ""
-    text = "".join(elem.itertext())
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    # str.split() breaks on exactly the characters r"\s" matches, so this
+    # collapses whitespace runs and strips without the regex engine.
+    # Interned: the same boilerplate descriptions and type names recur on
+    # thousands of members, and each distinct text is then stored once.
+    return sys.intern(" ".join("".join(elem.itertext()).split()))
 
 
+@functools.lru_cache(maxsize=4096)
 def _merge_descriptions(short_description: str, long_description: str) -> str:
     """Merge short and long description text into one field."""
+    if short_description is long_description:
+        return long_description
     if short_description and long_description:
         if long_description.startswith(short_description):
             return long_description
@@ -292,31 +406,36 @@ def _merge_descriptions(short_description: str, long_description: str) -> str:
 def analyze(data: dict, xml_path: str) -> dict:
     """Generate an analysis report from parsed data."""
     classes = data["classes"]
-    regular = [c for c in classes if not c["is_enum"]]
-    enums = [c for c in classes if c["is_enum"]]
-
-    total_properties = sum(len(c["properties"]) for c in classes)
-    total_methods = sum(len(c["methods"]) for c in classes)
-    total_parameters = sum(
-        len(m["parameters"])
-        for c in classes
-        for m in c["methods"]
-    )
-    superclass_count = sum(1 for c in classes if c["superclass_name"])
-    polymorphic_count = sum(
-        1
-        for c in classes
-        for p in c["properties"]
-        if p["data_type"] and "varies" in str(p["data_type"])
-    )
 
-    # Top classes by size
-    class_sizes = []
-    for c in regular:
-        n_props = len(c["properties"])
-        n_meths = len(c["methods"])
-        class_sizes.append((c["name"], n_props, n_meths))
-    class_sizes.sort(key=lambda x: x[1] + x[2], reverse=True)
+    # All aggregates are collected in a single pass over the classes.
+    regular_count = enum_count = 0
+    total_properties = total_methods = total_parameters = 0
+    superclass_count = polymorphic_count = 0
+    class_sizes = []  # (name, properties, methods) of regular classes
+    add_size = class_sizes.append
+    for c in classes:
+        props = c["properties"]
+        meths = c["methods"]
+        n_props = len(props)
+        n_meths = len(meths)
+        total_properties += n_props
+        total_methods += n_meths
+        if c["is_enum"]:
+            enum_count += 1
+        else:
+            regular_count += 1
+            add_size((c["name"], n_props, n_meths))
+        if c["superclass_name"]:
+            superclass_count += 1
+        for p in props:
+            data_type = p.data_type
+            if data_type and "varies" in data_type:
+                polymorphic_count += 1
+        for m in meths:
+            total_parameters += len(m.parameters)
+
+    # Top classes by size (ties keep document order, as a stable sort would)
+    top_classes = heapq.nlargest(5, class_sizes, key=lambda x: x[1] + x[2])
 
     stats = {
         "source_key": data.get("source_key", "unknown"),
@@ -325,14 +444,14 @@ def analyze(data: dict, xml_path: str) -> dict:
         "title": data["title"],
         "suite_count": len(data["suites"]),
         "class_count": len(classes),
-        "regular_count": len(regular),
-        "enum_count": len(enums),
+        "regular_count": regular_count,
+        "enum_count": enum_count,
         "property_count": total_properties,
         "method_count": total_methods,
         "parameter_count": total_parameters,
         "superclass_count": superclass_count,
         "polymorphic_count": polymorphic_count,
-        "top_classes": class_sizes[:5],
+        "top_classes": top_classes,
     }
 
     return stats
@@ -367,7 +486,7 @@ def print_report(stats: dict):
 # Database Generation
 # ---------------------------------------------------------------------------
 
-DB_SCHEMA = """
+DB_TABLES = """
 -- Metadata
 CREATE TABLE IF NOT EXISTS db_meta (
     key         TEXT PRIMARY KEY,
@@ -446,16 +565,28 @@ CREATE TABLE IF NOT EXISTS parameters (
     sort_order      INTEGER NOT NULL
 );
 
--- Full-text search
+-- Full-text search. Contentless: only the inverted index is stored, the
+-- matched rows are read back from the entity tables through search_refs.
 CREATE VIRTUAL TABLE IF NOT EXISTS dom_search USING fts5(
     entity_type,
     entity_name,
     parent_name,
     description,
-    source
+    content=''
 );
 
--- Indices
+-- dom_search rowid -> indexed entity
+CREATE TABLE IF NOT EXISTS search_refs (
+    id              INTEGER PRIMARY KEY,
+    source_id       INTEGER NOT NULL REFERENCES sources(id),
+    entity_type     TEXT NOT NULL,
+    entity_id       INTEGER NOT NULL
+);
+"""
+
+# Secondary indices are created once the rows are in: building each B-tree
+# in one sorted pass is much cheaper than maintaining it across every insert.
+DB_INDICES = """
 CREATE INDEX IF NOT EXISTS idx_properties_class ON properties(class_id);
 CREATE INDEX IF NOT EXISTS idx_methods_class ON methods(class_id);
 CREATE INDEX IF NOT EXISTS idx_parameters_method ON parameters(method_id);
@@ -469,23 +600,83 @@ def build_database(data: dict | list[dict], db_path: str, xml_path: str | None =
     """Build SQLite database from one or many parsed source payloads."""
     sources_data = data if isinstance(data, list) else [data]
 
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    # The whole build runs in memory and reaches the disk as one sequential
+    # copy at the end; durability settings are moot until then.
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.execute("PRAGMA page_size=8192")
+    conn.execute("PRAGMA temp_store=MEMORY")
 
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        # Create tables; indices follow the bulk load
+        conn.executescript(DB_TABLES)
+
+        # All sources are loaded in one explicit transaction.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stats = _populate_database(conn, sources_data, xml_path)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        conn.executescript(DB_INDICES)
+        conn.execute("ANALYZE")
+        # Compact before copying, so the file is written without free pages.
+        conn.execute("VACUUM")
+
+        # An existing database is only replaced once the new one is complete.
+        try:
+            os.remove(db_path)
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            pass  # held open by a running server (Windows): overwrite in place
+        disk = sqlite3.connect(db_path)
+        try:
+            _prepare_backup_target(disk, conn, db_path)
+            conn.backup(disk)
+        finally:
+            disk.close()
+    finally:
+        conn.close()
+
+    stats["db_path"] = db_path
+    return stats
+
+
+def _prepare_backup_target(disk: sqlite3.Connection, source: sqlite3.Connection, db_path: str) -> None:
+    """Make an existing database file writable by an online backup.
+
+    SQLite cannot back up onto a WAL database whose page size differs from the
+    source (older builds used WAL with 4096-byte pages), so such a file is
+    switched to rollback journaling first. That only succeeds while no other
+    connection holds the file open.
+    """
+    journal_mode = disk.execute("PRAGMA journal_mode").fetchone()[0]
+    page_size = disk.execute("PRAGMA page_size").fetchone()[0]
+    source_page_size = source.execute("PRAGMA page_size").fetchone()[0]
+    if journal_mode.lower() != "wal" and page_size == source_page_size:
+        return
+    try:
+        journal_mode = disk.execute("PRAGMA journal_mode=DELETE").fetchone()[0]
+    except sqlite3.OperationalError:
+        journal_mode = "wal"
+    if journal_mode.lower() == "wal":
+        raise RuntimeError(
+            f"Cannot replace {db_path}: it is open in another process "
+            "(most likely the MCP server). Stop the MCP server, then rebuild."
+        )
 
-    # Create schema
-    conn.executescript(DB_SCHEMA)
 
+def _populate_database(conn: sqlite3.Connection, sources_data: list[dict], xml_path: str | None) -> dict:
+    """Insert all rows of a build into a freshly created schema."""
     build_ts = datetime.now().isoformat(timespec="seconds")
     source_files = [d.get("source_file", "") for d in sources_data]
     source_keys = [d.get("source_key", "") for d in sources_data]
     dom_payload = next((d for d in sources_data if d.get("source_key") == "dom"), sources_data[0])
     meta = {
         "source_file": os.path.basename(xml_path) if xml_path else dom_payload.get("source_file", ""),
-        "source_files": json.dumps(source_files),
+        "source_files": ",".join(source_files),
         "source_keys": ",".join(source_keys),
         "dom_version": dom_payload.get("version", ""),
         "dom_title": dom_payload.get("title", ""),
@@ -510,115 +701,121 @@ def build_database(data: dict | list[dict], db_path: str, xml_path: str | None =
         )
         source_ids[source_key] = cur.lastrowid
 
-    suite_ids = {}
+    suite_ids = {}  # source_key -> suite name -> suite id
     for payload in sources_data:
         source_id = source_ids[payload["source_key"]]
+        source_suite_ids = suite_ids.setdefault(payload["source_key"], {})
         for suite_name in sorted(payload["suites"].keys()):
             cur = conn.execute(
                 "INSERT INTO suites (source_id, name) VALUES (?, ?)",
                 (source_id, suite_name),
             )
-            suite_ids[(payload["source_key"], suite_name)] = cur.lastrowid
-
-    total_classes = 0
-    total_props = 0
-    total_meths = 0
-    total_params = 0
+            source_suite_ids[suite_name] = cur.lastrowid
+
+    # Row ids are assigned here (the tables start empty) so each table can
+    # be filled with a single executemany() instead of one execute() per row.
+    class_rows = []
+    prop_rows = []
+    meth_rows = []
+    param_rows = []
     fts_rows = []
+    ref_rows = []
+    add_fts = fts_rows.append
+    add_ref = ref_rows.append
 
     for payload in sources_data:
         source_key = payload["source_key"]
         source_id = source_ids[source_key]
+        source_suite_ids = suite_ids.get(source_key, {})
         for cls in payload["classes"]:
-            suite_id = suite_ids.get((source_key, cls["suite"]))
-            cur = conn.execute(
-                """INSERT INTO classes
-                   (name, source_id, suite_id, is_enum, is_dynamic, description, description_long, superclass_name)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    cls["name"],
-                    source_id,
-                    suite_id,
-                    int(cls["is_enum"]),
-                    int(cls["is_dynamic"]),
-                    cls["description"],
-                    cls["description_long"],
-                    cls["superclass_name"],
-                ),
-            )
-            class_id = cur.lastrowid
-            total_classes += 1
+            suite_id = source_suite_ids.get(cls["suite"])
+            class_id = len(class_rows) + 1
+            class_rows.append((
+                class_id,
+                cls["name"],
+                source_id,
+                suite_id,
+                int(cls["is_enum"]),
+                int(cls["is_dynamic"]),
+                cls["description"],
+                cls["description_long"],
+                cls["superclass_name"],
+            ))
 
             entity_type = "enum" if cls["is_enum"] else "class"
-            fts_rows.append((entity_type, cls["name"], "", cls["description"], source_key))
+            search_id = len(fts_rows) + 1
+            add_fts((search_id, entity_type, cls["name"], "", cls["description"]))
+            add_ref((search_id, source_id, entity_type, class_id))
 
             for prop in cls["properties"]:
-                conn.execute(
-                    """INSERT INTO properties
-                       (class_id, name, description, data_type, data_type_ref, is_array,
-                        is_readonly, element_type, default_value, min_value, max_value)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        class_id,
-                        prop["name"],
-                        prop["description"],
-                        prop["data_type"],
-                        prop["data_type_ref"],
-                        int(prop["is_array"]),
-                        int(prop["is_readonly"]),
-                        prop["element_type"],
-                        prop["default_value"],
-                        prop["min_value"],
-                        prop["max_value"],
-                    ),
-                )
-                total_props += 1
-                fts_rows.append(("property", prop["name"], cls["name"], prop["description"], source_key))
+                prop_id = len(prop_rows) + 1
+                prop_rows.append((prop_id, class_id, *prop))
+                search_id += 1
+                add_fts((search_id, "property", prop.name, cls["name"], prop.description))
+                add_ref((search_id, source_id, "property", prop_id))
 
             for meth in cls["methods"]:
-                cur = conn.execute(
-                    """INSERT INTO methods
-                       (class_id, name, description, return_type, return_type_ref, return_is_array, element_type)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        class_id,
-                        meth["name"],
-                        meth["description"],
-                        meth["return_type"],
-                        meth["return_type_ref"],
-                        int(meth["return_is_array"]),
-                        meth["element_type"],
-                    ),
-                )
-                method_id = cur.lastrowid
-                total_meths += 1
-                fts_rows.append(("method", meth["name"], cls["name"], meth["description"], source_key))
-
-                for param in meth["parameters"]:
-                    conn.execute(
-                        """INSERT INTO parameters
-                           (method_id, name, description, data_type, data_type_ref, is_array,
-                            is_optional, default_value, sort_order)
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (
-                            method_id,
-                            param["name"],
-                            param["description"],
-                            param["data_type"],
-                            param["data_type_ref"],
-                            int(param["is_array"]),
-                            int(param["is_optional"]),
-                            param["default_value"],
-                            param["sort_order"],
-                        ),
-                    )
-                    total_params += 1
-                    fts_rows.append(("parameter", param["name"], cls["name"], param["description"], source_key))
+                method_id = len(meth_rows) + 1
+                meth_rows.append((
+                    method_id,
+                    class_id,
+                    meth.name,
+                    meth.description,
+                    meth.return_type,
+                    meth.return_type_ref,
+                    meth.return_is_array,
+                    meth.element_type,
+                ))
+                search_id += 1
+                add_fts((search_id, "method", meth.name, cls["name"], meth.description))
+                add_ref((search_id, source_id, "method", method_id))
+
+                for param in meth.parameters:
+                    param_id = len(param_rows) + 1
+                    param_rows.append((param_id, method_id, *param))
+                    search_id += 1
+                    add_fts((search_id, "parameter", param.name, cls["name"], param.description))
+                    add_ref((search_id, source_id, "parameter", param_id))
 
     conn.executemany(
-        "INSERT INTO dom_search (entity_type, entity_name, parent_name, description, source) VALUES (?, ?, ?, ?, ?)",
+        """INSERT INTO classes
+           (id, name, source_id, suite_id, is_enum, is_dynamic, description, description_long, superclass_name)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        class_rows,
+    )
+    conn.executemany(
+        """INSERT INTO properties
+           (id, class_id, name, description, data_type, data_type_ref, is_array,
+            is_readonly, element_type, default_value, min_value, max_value)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        prop_rows,
+    )
+    conn.executemany(
+        """INSERT INTO methods
+           (id, class_id, name, description, return_type, return_type_ref, return_is_array, element_type)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        meth_rows,
+    )
+    conn.executemany(
+        """INSERT INTO parameters
+           (id, method_id, name, description, data_type, data_type_ref, is_array,
+            is_optional, default_value, sort_order)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        param_rows,
+    )
+    total_classes = len(class_rows)
+    total_props = len(prop_rows)
+    total_meths = len(meth_rows)
+    total_params = len(param_rows)
+
+    conn.executemany(
+        "INSERT INTO dom_search (rowid, entity_type, entity_name, parent_name, description) VALUES (?, ?, ?, ?, ?)",
         fts_rows,
     )
+    conn.executemany(
+        "INSERT INTO search_refs (id, source_id, entity_type, entity_id) VALUES (?, ?, ?, ?)",
+        ref_rows,
+    )
 
     conn.execute("INSERT INTO db_meta (key, value) VALUES (?, ?)", ("source_count", str(len(sources_data))))
     conn.execute("INSERT INTO db_meta (key, value) VALUES (?, ?)", ("class_count", str(total_classes)))
@@ -630,9 +827,6 @@ def build_database(data: dict | list[dict], db_path: str, xml_path: str | None =
         ("suite_count", str(sum(len(payload["suites"]) for payload in sources_data))),
     )
 
-    conn.commit()
-    conn.close()
-
     return {
         "source_count": len(sources_data),
         "class_count": total_classes,
@@ -641,7 +835,6 @@ def build_database(data: dict | list[dict], db_path: str, xml_path: str | None =
         "parameter_count": total_params,
         "suite_count": sum(len(payload["suites"]) for payload in sources_data),
         "fts_rows": len(fts_rows),
-        "db_path": db_path,
         "build_timestamp": build_ts,
     }
 
@@ -650,8 +843,19 @@ def build_database(data: dict | list[dict], db_path: str, xml_path: str | None =
 # Validation
 # ---------------------------------------------------------------------------
 
-def validate(data: dict | list[dict] | None, db_path: str, expect_sources: list[str] | None = None) -> tuple[bool, list[str]]:
-    """Validate database against parsed source data."""
+def validate(
+    data: dict | list[dict] | None,
+    db_path: str,
+    expect_sources: list[str] | None = None,
+    expected_stats: dict | None = None,
+) -> tuple[bool, list[str]]:
+    """Validate database against parsed source data.
+
+    Only the already-parsed ``data`` is consulted; the XML is never
+    re-read, so callers that build and then validate parse each source once.
+    ``expected_stats`` (the dict returned by ``build_database``) supplies the
+    expected counts without walking ``data`` again.
+    """
     messages = []
     passed = True
 
@@ -661,11 +865,22 @@ def validate(data: dict | list[dict] | None, db_path: str, expect_sources: list[
     conn = sqlite3.connect(db_path)
 
     source_payloads = data if isinstance(data, list) else ([data] if isinstance(data, dict) else [])
-    expected_classes = sum(len(payload["classes"]) for payload in source_payloads)
-    expected_suites = sum(len(payload["suites"]) for payload in source_payloads)
-    expected_props = sum(len(c["properties"]) for payload in source_payloads for c in payload["classes"])
-    expected_methods = sum(len(c["methods"]) for payload in source_payloads for c in payload["classes"])
-    expected_params = sum(len(m["parameters"]) for payload in source_payloads for c in payload["classes"] for m in c["methods"])
+    if expected_stats is not None:
+        expected_classes = expected_stats["class_count"]
+        expected_suites = expected_stats["suite_count"]
+        expected_props = expected_stats["property_count"]
+        expected_methods = expected_stats["method_count"]
+        expected_params = expected_stats["parameter_count"]
+    else:
+        expected_classes = expected_suites = expected_props = expected_methods = expected_params = 0
+        for payload in source_payloads:
+            expected_suites += len(payload["suites"])
+            for c in payload["classes"]:
+                expected_classes += 1
+                expected_props += len(c["properties"])
+                expected_methods += len(c["methods"])
+                for m in c["methods"]:
+                    expected_params += len(m.parameters)
 
     checks = [
         ("classes", expected_classes),
@@ -676,8 +891,12 @@ def validate(data: dict | list[dict] | None, db_path: str, expect_sources: list[
     ]
 
     if source_payloads:
-        for table, expected in checks:
-            (actual,) = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        # Every row count (the FTS index last) in a single round trip.
+        counts = conn.execute(
+            "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table, _ in checks)
+            + ", (SELECT COUNT(*) FROM dom_search)"
+        ).fetchone()
+        for (table, expected), actual in zip(checks, counts):
             if actual != expected:
                 messages.append(f"FAIL: {table} count mismatch: DB={actual}, XML={expected}")
                 passed = False
@@ -693,8 +912,8 @@ def validate(data: dict | list[dict] | None, db_path: str, expect_sources: list[
         else:
             messages.append(f"  OK: sources present: {sorted(found_sources)}")
 
-    (fts_count,) = conn.execute("SELECT COUNT(*) FROM dom_search").fetchone()
     if source_payloads:
+        fts_count = counts[-1]
         expected_fts = expected_classes + expected_props + expected_methods + expected_params
         if fts_count == expected_fts:
             messages.append(f"  OK: FTS index rows = {fts_count}")
@@ -703,10 +922,13 @@ def validate(data: dict | list[dict] | None, db_path: str, expect_sources: list[
             passed = False
 
     meta_keys = ["source_file", "source_files", "source_keys", "dom_version", "dom_title", "build_timestamp", "parser_version"]
+    meta = dict(conn.execute(
+        f"SELECT key, value FROM db_meta WHERE key IN ({', '.join('?' * len(meta_keys))})",
+        meta_keys,
+    ))
     for key in meta_keys:
-        row = conn.execute("SELECT value FROM db_meta WHERE key = ?", (key,)).fetchone()
-        if row:
-            messages.append(f"  OK: db_meta[{key}] = {row[0]}")
+        if key in meta:
+            messages.append(f"  OK: db_meta[{key}] = {meta[key]}")
         else:
             messages.append(f"FAIL: db_meta[{key}] missing")
             passed = False
@@ -19,9 +19,14 @@ Provides tools for querying multi-source ExtendScript knowledge:
   9. dom_info           – DB metadata and statistics
 """
 
+import base64
+import functools
+import inspect
 import json
+import logging
 import os
 import sys
+import threading
 from pathlib import Path
 
 # Add script directory to sys.path so db module can be imported
@@ -31,6 +36,16 @@ from mcp.server.fastmcp import FastMCP
 
 import db
 
+try:  # optional, faster JSON encoding of large responses
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # optional, for clients that opt in to binary payloads
+    import msgpack
+except ImportError:
+    msgpack = None
+
 # Resolve DB path
 DB_PATH = os.environ.get(
     "EXTENDSCRIPT_DB",
@@ -40,6 +55,13 @@ DB_PATH = os.environ.get(
     ),
 )
 
+log = logging.getLogger("server")
+
+# Opt-in: responses become "msgpack:" + base64 of the msgpack-encoded result.
+_USE_BINARY = os.environ.get("MCP_BINARY_PAYLOADS") == "1" and msgpack is not None
+if os.environ.get("MCP_BINARY_PAYLOADS") == "1" and msgpack is None:
+    log.warning("MCP_BINARY_PAYLOADS=1 is set but msgpack is not installed; responses stay JSON.")
+
 mcp = FastMCP(
     "InDesign DOM",
     instructions=(
@@ -62,33 +84,136 @@ mcp = FastMCP(
 )
 
 
+_COMPACT_JSON_SIZE = 4096
+
+
 def _fmt(obj) -> str:
-    """Format result as indented JSON string."""
-    return json.dumps(obj, indent=2, ensure_ascii=False)
+    """Format result as JSON string (orjson when available).
+
+    Results up to _COMPACT_JSON_SIZE UTF-8 bytes are indented; larger ones
+    are written compact, which roughly halves them.
+    """
+    if _USE_BINARY:
+        return "msgpack:" + base64.b64encode(msgpack.packb(obj, use_bin_type=True)).decode("ascii")
+    if orjson is not None:
+        try:
+            text = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+            if len(text) <= _COMPACT_JSON_SIZE:
+                text = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            return text.decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bit: let json decide
+    text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    if len(text.encode("utf-8")) <= _COMPACT_JSON_SIZE:
+        text = json.dumps(obj, indent=2, ensure_ascii=False)
+    return text
+
+
+_SCRIPTUI_NOTE = (
+    "ScriptUI is legacy technology. For new UI development, prefer a modern "
+    "UXP plugin. ScriptUI remains useful for small dialogs and for maintaining "
+    "existing scripts."
+)
 
 
 def _append_scriptui_note(payload, source: str | None):
-    """Append ScriptUI modernization note when ScriptUI data is requested."""
-    note = (
-        "ScriptUI is legacy technology. For new UI development, prefer a modern "
-        "UXP plugin. ScriptUI remains useful for small dialogs and for maintaining "
-        "existing scripts."
-    )
+    """Append ScriptUI modernization note when ScriptUI data is requested.
+
+    List results are wrapped as ``{"note": ..., "results": [...]}`` so the
+    note appears once rather than on every row.
+    """
     if source == "scriptui":
         if isinstance(payload, dict):
             payload = dict(payload)
-            payload["note"] = note
+            payload["note"] = _SCRIPTUI_NOTE
             return payload
         if isinstance(payload, list):
-            return [{"note": note, **item} if isinstance(item, dict) else item for item in payload]
+            return {"note": _SCRIPTUI_NOTE, "results": payload}
     return payload
 
 
+def _db_version() -> int:
+    """Return the database file's mtime; it changes whenever the DB is rebuilt."""
+    try:
+        return os.stat(DB_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+
+_local = threading.local()
+
+
+def _conn():
+    """Return this thread's shared read-only connection to the database.
+
+    Opening a connection per tool call costs more than most queries; the
+    handle is reopened when the database file is rebuilt.
+    """
+    version = _db_version()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.version != version:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = db.connect(DB_PATH)
+        _local.conn, _local.version = conn, version
+    return conn
+
+
+_OPTIONAL_ARGS = ("source", "suite", "filter")
+
+
+def _normalize_args(arguments: dict) -> None:
+    """Bring equivalent tool arguments to one spelling, in place.
+
+    Strings are stripped and empty optional filters become None, so
+    " TextFrame " and "TextFrame" share a cache entry. Names stay
+    case-sensitive, like the lookups themselves.
+    """
+    for key, value in arguments.items():
+        if isinstance(value, str):
+            arguments[key] = value.strip()
+    for key in _OPTIONAL_ARGS:
+        if key in arguments and not arguments[key]:
+            arguments[key] = None
+    if "type" in arguments and not arguments["type"]:
+        arguments["type"] = "all"
+
+
+def _cached_tool(maxsize: int = 512):
+    """Memoize a tool's response string per normalized argument set.
+
+    The database is read-only while the server runs, so a response only
+    goes stale when the file is rebuilt; its mtime is part of the cache key.
+    "Not found" answers are cached like any other, which is why tools that
+    agents probe with guessed names get a larger ``maxsize``.
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.lru_cache(maxsize=maxsize)
+        def cached(db_version, **kwargs):
+            return fn(**kwargs)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            _normalize_args(bound.arguments)
+            return cached(_db_version(), **bound.arguments)
+
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+
+    return decorate
+
+
 # ---------------------------------------------------------------------------
 # Tool 1: lookup_class
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool(maxsize=2048)
 def lookup_class(name: str, source: str | None = None) -> str:
     """Look up full information for an InDesign DOM class.
 
@@ -99,7 +224,7 @@ def lookup_class(name: str, source: str | None = None) -> str:
         name: The exact class name (e.g. "TextFrame", "Document", "Application")
         source: Optional source filter ("dom", "javascript", "scriptui")
     """
-    result = db.lookup_class(name, source=source, db_path=DB_PATH)
+    result = db.lookup_class(name, source=source, conn=_conn())
     if not result:
         return f"Class '{name}' not found."
     return _fmt(_append_scriptui_note(result, source))
@@ -110,6 +235,7 @@ def lookup_class(name: str, source: str | None = None) -> str:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool()
 def get_properties(
     class_name: str,
     source: str | None = None,
@@ -120,7 +246,9 @@ def get_properties(
 
     Args:
         class_name: The class name (e.g. "TextFrame")
-        source: Optional source filter ("dom", "javascript", "scriptui")
+        source: Optional source filter ("dom", "javascript", "scriptui").
+            With "scriptui" the list is returned as
+            ``{"note": ..., "results": [...]}``.
         filter: Optional substring filter on property name or description
         include_inherited: If true, includes properties from superclasses
     """
@@ -129,7 +257,7 @@ def get_properties(
         source=source,
         filter_text=filter,
         include_inherited=include_inherited,
-        db_path=DB_PATH,
+        conn=_conn(),
     )
     if not results:
         msg = f"No properties found for '{class_name}'"
@@ -144,6 +272,7 @@ def get_properties(
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool()
 def get_methods(
     class_name: str,
     source: str | None = None,
@@ -154,7 +283,9 @@ def get_methods(
 
     Args:
         class_name: The class name (e.g. "Document")
-        source: Optional source filter ("dom", "javascript", "scriptui")
+        source: Optional source filter ("dom", "javascript", "scriptui").
+            With "scriptui" the list is returned as
+            ``{"note": ..., "results": [...]}``.
         filter: Optional substring filter on method name or description
         include_inherited: If true, includes methods from superclasses
     """
@@ -163,7 +294,7 @@ def get_methods(
         source=source,
         filter_text=filter,
         include_inherited=include_inherited,
-        db_path=DB_PATH,
+        conn=_conn(),
     )
     if not results:
         msg = f"No methods found for '{class_name}'"
@@ -178,6 +309,7 @@ def get_methods(
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool(maxsize=2048)
 def get_method_detail(class_name: str, method_name: str, source: str | None = None) -> str:
     """Get full detail for a single method including all parameters.
 
@@ -186,7 +318,7 @@ def get_method_detail(class_name: str, method_name: str, source: str | None = No
         method_name: The method name (e.g. "findGrep")
         source: Optional source filter ("dom", "javascript", "scriptui")
     """
-    result = db.get_method_detail(class_name, method_name, source=source, db_path=DB_PATH)
+    result = db.get_method_detail(class_name, method_name, source=source, conn=_conn())
     if not result:
         return f"Method '{method_name}' not found on class '{class_name}'."
     return _fmt(_append_scriptui_note(result, source))
@@ -197,6 +329,7 @@ def get_method_detail(class_name: str, method_name: str, source: str | None = No
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool(maxsize=2048)
 def get_enum_values(enum_name: str, source: str | None = None) -> str:
     """Get all values of an InDesign DOM enumeration.
 
@@ -204,7 +337,7 @@ def get_enum_values(enum_name: str, source: str | None = None) -> str:
         enum_name: The enum class name (e.g. "Justification")
         source: Optional source filter ("dom", "javascript", "scriptui")
     """
-    result = db.get_enum_values(enum_name, source=source, db_path=DB_PATH)
+    result = db.get_enum_values(enum_name, source=source, conn=_conn())
     if not result:
         return f"Enum '{enum_name}' not found."
     return _fmt(_append_scriptui_note(result, source))
@@ -215,6 +348,7 @@ def get_enum_values(enum_name: str, source: str | None = None) -> str:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool()
 def get_hierarchy(class_name: str, source: str | None = None) -> str:
     """Get the full inheritance chain and direct subclasses of a class.
 
@@ -222,7 +356,7 @@ def get_hierarchy(class_name: str, source: str | None = None) -> str:
         class_name: The class name (e.g. "TextFrame")
         source: Optional source filter ("dom", "javascript", "scriptui")
     """
-    result = db.get_hierarchy(class_name, source=source, db_path=DB_PATH)
+    result = db.get_hierarchy(class_name, source=source, conn=_conn())
     if not result:
         return f"Class '{class_name}' not found."
     return _fmt(_append_scriptui_note(result, source))
@@ -233,6 +367,7 @@ def get_hierarchy(class_name: str, source: str | None = None) -> str:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool()
 def search_dom(query: str, source: str | None = None) -> str:
     """Full-text search across all InDesign DOM entities.
 
@@ -241,9 +376,11 @@ def search_dom(query: str, source: str | None = None) -> str:
 
     Args:
         query: Search terms (e.g. "find grep change", "hyperlink", "export pdf")
-        source: Optional source filter ("dom", "javascript", "scriptui")
+        source: Optional source filter ("dom", "javascript", "scriptui").
+            With "scriptui" the list is returned as
+            ``{"note": ..., "results": [...]}``.
     """
-    results = db.search_dom(query, source=source, max_results=20, db_path=DB_PATH)
+    results = db.search_dom(query, source=source, max_results=20, conn=_conn())
     if not results:
         return f"No results found for '{query}'."
     return _fmt(_append_scriptui_note(results, source))
@@ -254,6 +391,7 @@ def search_dom(query: str, source: str | None = None) -> str:
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool()
 def list_classes(
     suite: str | None = None,
     type: str = "all",
@@ -264,9 +402,11 @@ def list_classes(
     Args:
         suite: Filter by suite name (e.g. "Text Suite", "Color Suite")
         type: Filter by type: "class", "enum", or "all" (default)
-        source: Optional source filter ("dom", "javascript", "scriptui")
+        source: Optional source filter ("dom", "javascript", "scriptui").
+            With "scriptui" the list is returned as
+            ``{"note": ..., "results": [...]}``.
     """
-    results = db.list_classes(suite=suite, type_filter=type, source=source, db_path=DB_PATH)
+    results = db.list_classes(suite=suite, type_filter=type, source=source, conn=_conn())
     if not results:
         msg = "No classes found"
         if suite:
@@ -280,25 +420,28 @@ def list_classes(
 # ---------------------------------------------------------------------------
 
 @mcp.tool()
+@_cached_tool()
 def dom_info() -> str:
     """Get InDesign DOM database metadata and statistics.
 
     Returns DOM version, source file, build timestamp, and entity counts.
     """
-    result = db.dom_info(db_path=DB_PATH)
+    result = db.dom_info(conn=_conn())
     return _fmt(result)
 
 
 @mcp.tool()
+@_cached_tool()
 def list_sources() -> str:
     """List loaded knowledge sources and counts."""
-    return _fmt(db.list_sources(db_path=DB_PATH))
+    return _fmt(db.list_sources(conn=_conn()))
 
 
 @mcp.tool()
+@_cached_tool()
 def knowledge_overview() -> str:
     """Get a compact capability overview for this MCP server."""
-    return _fmt(db.knowledge_overview(db_path=DB_PATH))
+    return _fmt(db.knowledge_overview(conn=_conn()))
 
 
 # ---------------------------------------------------------------------------